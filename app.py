@@ -4,14 +4,23 @@ Flask web application with dual analysis: rule-based detection + GPT-4o-mini AI
 """
 
 import os
+import re
 import sqlite3
+import hashlib
 import json
-import uuid
 import time
+import functools
+import itertools
+import queue
 import logging
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from datetime import datetime
-from dataclasses import asdict
-from flask import Flask, request, render_template, flash, redirect, url_for, jsonify
+from typing import Optional
+from flask import Flask, request, render_template, flash, redirect, url_for, jsonify, session
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
@@ -19,20 +28,19 @@ from dotenv import load_dotenv
 import mimetypes
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+import services.rate_limit_storage  # Registers the bucket:// rate limit storage
 
 # Import core services
-from services.parser import parse_email_content, get_email_hash, EmailParsingError
-from services.rules import analyze_email
+from services.parser import EmailParser, parse_email_content, get_email_hash, read_stream_with_hash, EmailParsingError, EMAIL_HASH_ALGORITHM
+from services.rules import analyze_email, get_rule_engine
 
 # Import AI services
-from services.ai import analyze_email_with_ai, get_ai_analyzer, reset_ai_analyzer
+from services.ai import get_ai_analyzer, reset_ai_analyzer
+from services.ai_batcher import get_ai_batcher
 
-# Import Phase 4 services
-from services.url_reputation import get_url_reputation_service
-from services.cache_manager import get_cache_manager
-from services.batch_processor import get_batch_processor
-from services.monitoring import get_performance_monitor
-from services.report_export import get_export_service
+# Phase 4 services are imported on first use (see the accessors below)
+from services.json_provider import ORJSON_AVAILABLE, OrjsonProvider, dumps_json, loads_json
+from services.db_pool import get_db_pool
 
 # Load environment variables (force reload to override any existing env vars)
 load_dotenv(override=True)
@@ -50,6 +58,8 @@ else:
     logger.warning("No OPENAI_API_KEY found in environment")
 
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-change-in-production')
 app.config['MAX_CONTENT_LENGTH'] = 25 * 1024 * 1024  # 25MB max file size
 
@@ -58,7 +68,7 @@ limiter = Limiter(
     key_func=get_remote_address,
     app=app,
     default_limits=["100 per hour"],  # General rate limit
-    storage_uri="memory://"
+    storage_uri="bucket://"
 )
 
 # AI service availability
@@ -70,309 +80,713 @@ else:
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'.eml', '.txt', '.msg'}
+ALLOWED_EXTENSIONS = frozenset({'.eml', '.txt', '.msg'})
+ALLOWED_MIME_TYPES = frozenset({'text/plain', 'message/rfc822', 'application/octet-stream', 'text/x-mail'})
 DATABASE_PATH = os.getenv('DATABASE_PATH', 'phishing_detector.db')
 
 # Ensure upload directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Initialize Phase 4 services
-try:
-    # Initialize performance monitoring
-    performance_monitor = get_performance_monitor()
-    performance_monitor.start_background_monitoring()
-    logger.info("Phase 4 services initialized successfully")
-    
-    # Initialize cache manager
-    cache_manager = get_cache_manager()
-    cache_health = cache_manager.health_check()
-    logger.info(f"Cache manager status: {cache_health.get('status', 'unknown')}")
-    
-    PHASE4_ENABLED = True
-    
-except Exception as e:
-    logger.warning(f"Phase 4 services initialization failed: {e}")
-    PHASE4_ENABLED = False
+# Stats page queries, read from the trigger-maintained counter tables (see
+# create_base_schema.py). Kept as module constants so each pooled connection's
+# statement cache reuses the compiled statements across requests.
+STATS_TOTAL_SQL = 'SELECT COALESCE(SUM(count), 0) FROM daily_counts'
+STATS_LABEL_SQL = '''
+    SELECT label, count, CAST(sum_score AS REAL) / count as avg_score
+    FROM stats_counters
+    WHERE count > 0
+    ORDER BY count DESC
+'''
+STATS_DAILY_SQL = '''
+    SELECT date, count
+    FROM daily_counts
+    WHERE date >= date('now', '-7 days') AND count > 0
+    ORDER BY date DESC
+'''
+# Full-scan equivalents for databases created before the counter tables
+STATS_TOTAL_SCAN_SQL = 'SELECT COUNT(*) FROM emails'
+STATS_LABEL_SCAN_SQL = '''
+    SELECT label, COUNT(*) as count, AVG(score) as avg_score
+    FROM detections
+    GROUP BY label
+    ORDER BY count DESC
+'''
+STATS_DAILY_SCAN_SQL = '''
+    SELECT DATE(uploaded_at) as date, COUNT(*) as count
+    FROM emails
+    WHERE uploaded_at >= date('now', '-7 days')
+    GROUP BY DATE(uploaded_at)
+    ORDER BY date DESC
+'''
+STATS_AI_TOTALS_SQL = '''
+    SELECT SUM(requests_count) as total_requests,
+           SUM(tokens_used) as total_tokens,
+           SUM(total_cost) as total_cost
+    FROM ai_usage_stats
+    WHERE date >= date('now', '-30 days')
+'''
+STATS_AI_DAILY_SQL = '''
+    SELECT date, requests_count, tokens_used, total_cost
+    FROM ai_usage_stats
+    WHERE date >= date('now', '-7 days')
+    ORDER BY date DESC
+'''
+
+# Result and listing page queries, likewise reused from the statement cache
+ANALYSIS_EMAIL_SQL = '''
+    SELECT e.*, d.score, d.label, d.confidence, d.evidence_json,
+           d.processing_time_ms, d.rules_checked, d.rules_fired,
+           d.created_at as analyzed_at
+    FROM emails e
+    JOIN detections d ON e.id = d.email_id
+    WHERE e.id = ?
+    ORDER BY d.created_at DESC
+    LIMIT 1
+'''
+ANALYSIS_PARSED_SQL = '''
+    SELECT headers_json, text_body, html_as_text, urls_json,
+           parse_time_ms, security_warnings
+    FROM email_parsed
+    WHERE email_id = ?
+'''
+ANALYSIS_AI_SQL = '''
+    SELECT score, label, evidence_json, tokens_used, cost_estimate,
+           processing_time_ms, success, error_message, created_at
+    FROM ai_detections
+    WHERE email_id = ?
+    ORDER BY created_at DESC
+    LIMIT 1
+'''
+# Newest detection and AI rows for an email; changes whenever either is written
+# or deleted (by any process), so it validates a cached analysis
+ANALYSIS_VERSION_SQL = '''
+    SELECT (SELECT MAX(rowid) FROM detections WHERE email_id = ?),
+           (SELECT MAX(rowid) FROM ai_detections WHERE email_id = ?)
+'''
+RECENT_ANALYSES_SQL = '''
+    SELECT id, filename, size_bytes, uploaded_at,
+           latest_score AS score, latest_label AS label,
+           latest_confidence AS confidence, latest_rules_fired AS rules_fired
+    FROM emails
+    WHERE latest_label IS NOT NULL
+    ORDER BY uploaded_at DESC
+    LIMIT ?
+'''
+# Join equivalent for databases created before the latest_* columns
+RECENT_ANALYSES_JOIN_SQL = '''
+    SELECT e.id, e.filename, e.size_bytes, e.uploaded_at,
+           d.score, d.label, d.confidence, d.rules_fired
+    FROM emails e
+    JOIN detections d ON d.rowid = (
+        SELECT rowid FROM detections
+        WHERE email_id = e.id
+        ORDER BY created_at DESC
+        LIMIT 1
+    )
+    ORDER BY e.uploaded_at DESC
+    LIMIT ?
+'''
+
+# Phase 4 services are imported and started on the first request rather than
+# at import, so processes that never serve traffic (CLI tools, the reloader
+# parent, idle pre-fork masters) don't pay for them. PHASE4_ENABLED drops to
+# False if they fail to start.
+PHASE4_ENABLED = True
+_phase4_started = False
+_phase4_lock = threading.Lock()
+
+
+def get_url_reputation_service():
+    """Shared URL reputation service (imported on first use)"""
+    from services.url_reputation import get_url_reputation_service as get_service
+    return get_service()
+
+
+def get_cache_manager():
+    """Shared cache manager (imported on first use)"""
+    from services.cache_manager import get_cache_manager as get_manager
+    return get_manager()
+
+
+def get_batch_processor():
+    """Shared batch processor (imported on first use)"""
+    from services.batch_processor import get_batch_processor as get_processor
+    return get_processor()
+
+
+def get_performance_monitor():
+    """Shared performance monitor (imported on first use)"""
+    from services.monitoring import get_performance_monitor as get_monitor
+    return get_monitor()
+
+
+def get_export_service():
+    """Shared report export service (imported on first use)"""
+    from services.report_export import get_export_service as get_service
+    return get_service()
+
+
+def start_phase4_services() -> None:
+    """Initialize Phase 4 services once; disables Phase 4 if that fails"""
+    global PHASE4_ENABLED, _phase4_started
+    if _phase4_started:
+        return
+    with _phase4_lock:
+        if _phase4_started:
+            return
+        try:
+            # Initialize performance monitoring
+            performance_monitor = get_performance_monitor()
+            performance_monitor.start_background_monitoring()
+            logger.info("Phase 4 services initialized successfully")
+            
+            # Initialize cache manager
+            cache_manager = get_cache_manager()
+            cache_health = cache_manager.health_check()
+            logger.info(f"Cache manager status: {cache_health.get('status', 'unknown')}")
+            
+        except Exception as e:
+            logger.warning(f"Phase 4 services initialization failed: {e}")
+            PHASE4_ENABLED = False
+        _phase4_started = True
+
+
+@app.before_request
+def ensure_phase4_services():
+    """Start Phase 4 services before the first request is handled"""
+    start_phase4_services()
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Borrow a pooled database connection (WAL mode, row factory)"""
+    return get_db_pool(DATABASE_PATH).acquire()
+
+
+def release_db_connection(conn: Optional[sqlite3.Connection]) -> None:
+    """Return a connection from get_db_connection() to the pool"""
+    get_db_pool(DATABASE_PATH).release(conn)
+
+
+# Upload hashes -> email id for emails that have been re-submitted, so further
+# duplicates skip even the index probe. Hashes are admitted on their first
+# repeat (a database hit), not on first upload, so one-off emails can't evict
+# the duplicates that actually recur.
+DEDUP_CACHE_SIZE = 4096
+_dedup_cache = OrderedDict()
+_dedup_lock = threading.Lock()
+
+
+def hash_key(email_hash: str) -> bytes:
+    """Raw 32-byte digest for a hex hash, as stored in emails.sha256"""
+    return bytes.fromhex(email_hash)
+
+
+# Databases written before hashes were stored as raw digests hold hex text,
+# which raw-digest lookups never match. Each process converts any such rows
+# once, before its first request (create_base_schema.py does the same offline).
+_hashes_converted = False
+_hashes_lock = threading.Lock()
+
+
+def convert_legacy_hashes() -> None:
+    """Convert hex-text emails.sha256 values to raw digests (once per process)"""
+    global _hashes_converted
+    if _hashes_converted:
+        return
+    with _hashes_lock:
+        if _hashes_converted:
+            return
+        conn = None
+        try:
+            conn = get_db_connection()
+            conn.create_function('unhex_digest', 1, bytes.fromhex, deterministic=True)
+            cursor = conn.execute("UPDATE emails SET sha256 = unhex_digest(sha256) WHERE typeof(sha256) = 'text'")
+            conn.commit()
+            if cursor.rowcount:
+                logger.info(f"Converted {cursor.rowcount} email hashes to binary digests")
+            _hashes_converted = True
+        except Exception as e:
+            logger.error(f"Email hash conversion failed: {str(e)}")
+        finally:
+            release_db_connection(conn)
+
+
+@app.before_request
+def ensure_binary_hashes():
+    """Make sure duplicate lookups can match every stored hash"""
+    convert_legacy_hashes()
+
+
+def remember_email_hash(email_hash: str, email_id: int) -> None:
+    """Record the stored email id for an upload hash (LRU bounded)"""
+    with _dedup_lock:
+        _dedup_cache[email_hash] = email_id
+        _dedup_cache.move_to_end(email_hash)
+        if len(_dedup_cache) > DEDUP_CACHE_SIZE:
+            _dedup_cache.popitem(last=False)
 
 
-def get_db_connection():
-    """Get database connection with row factory"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def find_existing_email(email_hash: str) -> Optional[int]:
+    """Return the id of an already analyzed email with this SHA-256, or None"""
+    with _dedup_lock:
+        email_id = _dedup_cache.get(email_hash)
+        if email_id is not None:
+            _dedup_cache.move_to_end(email_hash)
+            return email_id
+    
+    conn = None
+    try:
+        conn = get_db_connection()
+        row = conn.execute('SELECT id FROM emails WHERE sha256 = ?', (hash_key(email_hash),)).fetchone()
+    except Exception as e:
+        logger.error(f"Duplicate lookup failed: {str(e)}")
+        return None
+    finally:
+        release_db_connection(conn)
+    
+    if row is None:
+        return None
+    remember_email_hash(email_hash, row[0])
+    return row[0]
 
 
-def allowed_file(filename):
+def allowed_file(filename: Optional[str]) -> bool:
     """Check if uploaded file has allowed extension"""
     if not filename:
         return False
-    ext = os.path.splitext(filename.lower())[1]
-    return ext in ALLOWED_EXTENSIONS
+    # Lowercase only the suffix; like splitext, a leading-dot name has no extension
+    dot = filename.rfind('.')
+    if dot <= 0 or filename[dot:].lower() not in ALLOWED_EXTENSIONS:
+        return False
+    return bool(filename[:dot].lstrip('.'))
+
 
+# Names secure_filename() would return unchanged: ASCII letters, digits, '.', '_'
+# and '-', not starting or ending with '.' or '_'
+_SAFE_FILENAME_RE = re.compile(r'[A-Za-z0-9-](?:[A-Za-z0-9_.-]*[A-Za-z0-9-])?')
 
-def validate_file_content(file):
+
+def safe_upload_name(filename: str) -> str:
+    """secure_filename() with a fast path for names that are already safe"""
+    # Windows device names (CON, NUL, ...) still need werkzeug's check
+    if os.name != 'nt' and _SAFE_FILENAME_RE.fullmatch(filename):
+        return filename
+    return secure_filename(filename)
+
+
+def guess_mime_type(filename: str) -> str:
+    """MIME type guessed from a filename's extensions, falling back to text/plain"""
+    # guess_type() only looks at the extensions, so everything before the first
+    # dot can be dropped and the lookup cached per suffix
+    dot = filename.find('.')
+    return _guess_mime_type_for_suffix(filename[dot:] if dot >= 0 else '')
+
+
+@functools.lru_cache(maxsize=32)
+def _guess_mime_type_for_suffix(suffix: str) -> str:
+    """Cached guess_type() lookup for a single suffix"""
+    return mimetypes.guess_type('file' + suffix)[0] or 'text/plain'
+
+
+def validate_file_content(file: FileStorage) -> bool:
     """Validate file content using filename and basic checks"""
     try:
-        file_start = file.read(1024)
-        file.seek(0)
-        
-        # Use mimetypes based on filename, fallback to text/plain for email files
-        mime_type = mimetypes.guess_type(file.filename)[0]
-        if not mime_type or file.filename.endswith(('.eml', '.msg', '.txt')):
-            mime_type = 'text/plain'  # Assume email files are text-based
-        
-        allowed_mime_types = {
-            'text/plain',
-            'message/rfc822',
-            'application/octet-stream',
-            'text/x-mail'
-        }
+        # Email extensions are always treated as text; skip the MIME lookup
+        if allowed_file(file.filename):
+            return True
         
-        return mime_type in allowed_mime_types
+        return guess_mime_type(file.filename) in ALLOWED_MIME_TYPES
         
     except Exception as e:
         logger.error(f"File validation error: {str(e)}")
         return False
 
 
-def store_email_analysis(email_content, filename, parsed_email, detection_result, ai_result=None, url_analysis=None):
-    """Store complete email analysis in database (includes AI results)"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Generate unique request ID for logging
-        request_id = str(uuid.uuid4())[:8]
-        
-        # Calculate email hash
+# 8-hex-digit request ids for analysis logs, seeded from the clock and pid so
+# ids from different runs and workers rarely collide
+_request_ids = itertools.count((int(time.time()) ^ (os.getpid() << 16)) & 0xffffffff)
+
+
+# Rows per multi-row url_analysis INSERT: 9 columns each keeps a statement
+# under SQLite's default limit of 999 bound parameters
+URL_INSERT_MAX_ROWS = 100
+
+
+@functools.lru_cache(maxsize=None)
+def url_analysis_insert_sql(row_count: int) -> str:
+    """INSERT OR REPLACE statement for row_count url_analysis rows"""
+    return '''
+        INSERT OR REPLACE INTO url_analysis (
+            url_hash, original_url, is_malicious, threat_types, 
+            confidence_score, analysis_source, analysis_details,
+            created_at, expires_at
+        ) VALUES ''' + ', '.join(['(?, ?, ?, ?, ?, ?, ?, ?, ?)'] * row_count)
+
+
+def url_analysis_rows(url_results):
+    """Yield url_analysis table rows (one 9-tuple per URL) for URL reputation results"""
+    for result_data in url_results.values():
+        url = result_data['url']
+        analysis_time = result_data['analysis_time']
+        if hasattr(analysis_time, 'isoformat'):
+            analysis_time = analysis_time.isoformat()
+        yield (
+            hashlib.sha256(url.encode()).digest(),
+            url,
+            result_data['is_malicious'],
+            dumps_json(result_data['threat_types']),
+            result_data['confidence_score'],
+            result_data['source'],
+            dumps_json(result_data['details'] or {}),
+            analysis_time,
+            analysis_time  # For now, set same as analysis time
+        )
+
+
+# Raw HTML bodies are kept for reference but rarely read back, so they are
+# stored zlib-compressed (HTML typically shrinks 5-10x). Read the column
+# through unpack_html_body.
+HTML_BODY_COMPRESSION_LEVEL = 6
+
+
+def pack_html_body(html_body: str):
+    """Value for the email_parsed.html_body column (an empty body stays '')"""
+    if not html_body:
+        return html_body
+    return zlib.compress(html_body.encode('utf-8'), HTML_BODY_COMPRESSION_LEVEL)
+
+
+def unpack_html_body(value) -> str:
+    """HTML body from an email_parsed.html_body value (compressed BLOB or legacy text)"""
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value or ''
+
+
+def write_email_analysis(cursor, email_content, filename, parsed_email, detection_result, ai_result=None,
+                         url_analysis=None, email_hash=None, size_bytes=None, packed_html_body=None):
+    """
+    Insert one complete email analysis using the caller's transaction
+    
+    Returns the email id; raises on database errors so the caller can roll back.
+    """
+    # Generate unique request ID for logging
+    request_id = format(next(_request_ids) & 0xffffffff, '08x')
+    
+    # Calculate email hash unless the upload handler already streamed it
+    if email_hash is None:
         email_hash = get_email_hash(email_content)
-        
+    if size_bytes is None:
+        size_bytes = len(email_content)
+    if packed_html_body is None:
+        packed_html_body = pack_html_body(parsed_email.html_body)
+    
+    parse_summary = dumps_json({
+        'parse_time_ms': parsed_email.parse_time_ms,
+        'url_count': len(parsed_email.urls),
+        'security_warnings': len(parsed_email.security_warnings),
+        'request_id': request_id,
+        'ai_enabled': ai_result is not None,
+        'hash_algo': EMAIL_HASH_ALGORITHM
+    })
+    email_params = (filename, size_bytes, hash_key(email_hash), parse_summary)
+    
+    if SQLITE_HAS_RETURNING:
+        # Insert and get the new id in one statement; no row means the hash exists
+        cursor.execute('''
+            INSERT INTO emails (filename, size_bytes, sha256, parse_summary_json)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(sha256) DO NOTHING
+            RETURNING id
+        ''', email_params)
+        new_email = cursor.fetchone()
+        existing_email = None
+        if new_email is None:
+            cursor.execute('SELECT id FROM emails WHERE sha256 = ?', (hash_key(email_hash),))
+            existing_email = cursor.fetchone()
+    else:
         # Check if email already exists
-        cursor.execute('SELECT id FROM emails WHERE sha256 = ?', (email_hash,))
+        cursor.execute('SELECT id FROM emails WHERE sha256 = ?', (hash_key(email_hash),))
         existing_email = cursor.fetchone()
-        
-        if existing_email:
-            # Email already exists, use existing ID
-            email_id = existing_email[0]
-            logger.info(f"Email with hash {email_hash[:8]} already exists, using existing record (ID: {email_id})")
-        else:
-            # Store new email in emails table
+        new_email = None
+        if not existing_email:
             cursor.execute('''
                 INSERT INTO emails (filename, size_bytes, sha256, parse_summary_json)
                 VALUES (?, ?, ?, ?)
-            ''', (
-                filename,
-                len(email_content),
-                email_hash,
-                json.dumps({
-                    'parse_time_ms': parsed_email.parse_time_ms,
-                    'url_count': len(parsed_email.urls),
-                    'security_warnings': len(parsed_email.security_warnings),
-                    'request_id': request_id,
-                    'ai_enabled': ai_result is not None
-                })
-            ))
-            
-            email_id = cursor.lastrowid
-        
-        # Store or update parsed content
-        if not existing_email:
-            # Only insert parsed content for new emails
-            cursor.execute('''
-                INSERT INTO email_parsed (
-                    email_id, headers_json, text_body, html_body, html_as_text,
-                    urls_json, parse_time_ms, security_warnings
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                email_id,
-                json.dumps(asdict(parsed_email.headers)),
-                parsed_email.text_body,
-                parsed_email.html_body,
-                parsed_email.html_as_text,
-                json.dumps([asdict(url) for url in parsed_email.urls]),
-                parsed_email.parse_time_ms,
-                json.dumps(parsed_email.security_warnings)
-            ))
-        
-        # Store rule-based detection results
+            ''', email_params)
+    
+    if existing_email:
+        # Email already exists, use existing ID
+        email_id = existing_email[0]
+        logger.info(f"Email with hash {email_hash[:8]} already exists, using existing record (ID: {email_id})")
+    else:
+        email_id = new_email[0] if new_email else cursor.lastrowid
+    
+    # Store or update parsed content
+    if not existing_email:
+        # Only insert parsed content for new emails
         cursor.execute('''
-            INSERT INTO detections (
-                email_id, score, label, confidence, evidence_json,
-                processing_time_ms, rules_checked, rules_fired
+            INSERT INTO email_parsed (
+                email_id, headers_json, text_body, html_body, html_as_text,
+                urls_json, parse_time_ms, security_warnings
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             email_id,
-            detection_result.score,
-            detection_result.label,
-            detection_result.confidence,
-            json.dumps([asdict(evidence) for evidence in detection_result.evidence]),
-            detection_result.processing_time_ms,
-            detection_result.rules_checked,
-            detection_result.rules_fired
+            dumps_json(parsed_email.headers),
+            parsed_email.text_body,
+            packed_html_body,
+            parsed_email.html_as_text,
+            dumps_json(parsed_email.urls),
+            parsed_email.parse_time_ms,
+            dumps_json(parsed_email.security_warnings)
         ))
-        
-        # Store AI detection results if available
-        if ai_result:
-            cursor.execute('''
-                INSERT INTO ai_detections (
-                    email_id, score, label, evidence_json, tokens_used,
-                    cost_estimate, processing_time_ms, success, error_message
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                email_id,
-                ai_result.score,
-                ai_result.label,
-                json.dumps(ai_result.evidence),
-                ai_result.tokens_used,
-                ai_result.cost_estimate,
-                ai_result.processing_time_ms,
-                ai_result.success,
-                ai_result.error_message
-            ))
-            
-            # Update daily usage stats
-            cursor.execute('''
-                INSERT INTO ai_usage_stats (date, requests_count, tokens_used, total_cost)
-                VALUES (DATE('now'), 1, ?, ?)
-                ON CONFLICT(date) DO UPDATE SET
-                    requests_count = requests_count + 1,
-                    tokens_used = tokens_used + ?,
-                    total_cost = total_cost + ?,
-                    updated_at = CURRENT_TIMESTAMP
-            ''', (ai_result.tokens_used, ai_result.cost_estimate, 
-                  ai_result.tokens_used, ai_result.cost_estimate))
-        
-        # Store URL reputation analysis results if available (Phase 4)
-        if url_analysis and PHASE4_ENABLED:
+    
+    # Store rule-based detection results
+    cursor.execute('''
+        INSERT INTO detections (
+            email_id, score, label, confidence, evidence_json,
+            processing_time_ms, rules_checked, rules_fired
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        email_id,
+        detection_result.score,
+        detection_result.label,
+        detection_result.confidence,
+        dumps_json(detection_result.evidence),
+        detection_result.processing_time_ms,
+        detection_result.rules_checked,
+        detection_result.rules_fired
+    ))
+    
+    # Store AI detection results if available
+    if ai_result:
+        cursor.execute('''
+            INSERT INTO ai_detections (
+                email_id, score, label, evidence_json, tokens_used,
+                cost_estimate, processing_time_ms, success, error_message
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            email_id,
+            ai_result.score,
+            ai_result.label,
+            dumps_json(ai_result.evidence),
+            ai_result.tokens_used,
+            ai_result.cost_estimate,
+            ai_result.processing_time_ms,
+            ai_result.success,
+            ai_result.error_message
+        ))
+    
+        # Update daily usage stats
+        cursor.execute('''
+            INSERT INTO ai_usage_stats (date, requests_count, tokens_used, total_cost)
+            VALUES (DATE('now'), 1, ?, ?)
+            ON CONFLICT(date) DO UPDATE SET
+                requests_count = requests_count + 1,
+                tokens_used = tokens_used + ?,
+                total_cost = total_cost + ?,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (ai_result.tokens_used, ai_result.cost_estimate, 
+              ai_result.tokens_used, ai_result.cost_estimate))
+    
+    # Store URL reputation analysis results if available (Phase 4)
+    if url_analysis and PHASE4_ENABLED:
+        try:
+            # Store individual URL analyses in url_analysis table, one multi-row
+            # INSERT per URL_INSERT_MAX_ROWS URLs
+            url_rows = list(url_analysis_rows(url_analysis['results']))
+            for start in range(0, len(url_rows), URL_INSERT_MAX_ROWS):
+                chunk = url_rows[start:start + URL_INSERT_MAX_ROWS]
+                cursor.execute(url_analysis_insert_sql(len(chunk)), list(itertools.chain.from_iterable(chunk)))
+    
+            # Store URL analysis summary for this email (datetimes as ISO strings)
+            url_summary_json = dumps_json(url_analysis)
+    
+            # Try to add URL analysis summary to existing tables if columns exist
             try:
-                # Store individual URL analyses in url_analysis table
-                for url, result_data in url_analysis['results'].items():
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO url_analysis (
-                            url_hash, original_url, is_malicious, threat_types, 
-                            confidence_score, analysis_source, analysis_details,
-                            created_at, expires_at
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        result_data['url'][:64],  # Use first 64 chars as hash for simplicity
-                        result_data['url'],
-                        result_data['is_malicious'],
-                        json.dumps(result_data['threat_types']),
-                        result_data['confidence_score'],
-                        result_data['source'],
-                        json.dumps(result_data['details'] or {}),
-                        result_data['analysis_time'].isoformat() if hasattr(result_data['analysis_time'], 'isoformat') else result_data['analysis_time'],
-                        result_data['analysis_time'].isoformat() if hasattr(result_data['analysis_time'], 'isoformat') else result_data['analysis_time']  # For now, set same as analysis time
-                    ))
-                
-                # Store URL analysis summary for this email
-                # Convert datetime objects to strings before JSON serialization
-                def convert_datetime_to_string(obj):
-                    if isinstance(obj, dict):
-                        return {k: convert_datetime_to_string(v) for k, v in obj.items()}
-                    elif isinstance(obj, list):
-                        return [convert_datetime_to_string(v) for v in obj]
-                    elif hasattr(obj, 'isoformat'):  # datetime object
-                        return obj.isoformat()
-                    return obj
-                
-                url_analysis_serializable = convert_datetime_to_string(url_analysis)
-                url_summary_json = json.dumps(url_analysis_serializable)
-                
-                # Try to add URL analysis summary to existing tables if columns exist
-                try:
-                    cursor.execute('''
-                        UPDATE email_parsed 
-                        SET url_analysis_summary = ?
-                        WHERE email_id = ?
-                    ''', (url_summary_json, email_id))
-                except sqlite3.OperationalError:
-                    # Column doesn't exist yet, that's okay
-                    pass
-                    
+                cursor.execute('''
+                    UPDATE email_parsed 
+                    SET url_analysis_summary = ?
+                    WHERE email_id = ?
+                ''', (url_summary_json, email_id))
+            except sqlite3.OperationalError:
+                # Column doesn't exist yet, that's okay
+                pass
+    
+        except Exception as e:
+            logger.warning(f"Failed to store URL analysis results: {e}")
+    
+    # Log successful analysis (no PII)
+    log_msg = (f"Analysis complete [{request_id}]: "
+               f"rule_score={detection_result.score}, "
+               f"label={detection_result.label}, "
+               f"evidence_count={len(detection_result.evidence)}")
+    
+    if ai_result:
+        log_msg += (f", ai_score={ai_result.score}, "
+                   f"ai_tokens={ai_result.tokens_used}, "
+                   f"ai_cost=${ai_result.cost_estimate:.4f}, "
+                   f"ai_success={ai_result.success}")
+    
+    if url_analysis:
+        summary = url_analysis['summary']
+        log_msg += (f", urls_analyzed={summary['total_urls']}, "
+                   f"malicious_urls={summary['malicious_urls']}, "
+                   f"avg_confidence={summary['average_confidence']}")
+    
+    logger.info(log_msg)
+    
+    return email_id
+
+
+# INSERT ... RETURNING needs SQLite 3.35+
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Analysis writes go through a single writer thread that commits queued
+# analyses together (group commit) instead of one transaction per request.
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_WAIT_SECONDS = 0.05
+WRITE_RESULT_TIMEOUT_SECONDS = 30
+# After this long without writes the writer returns free pages to the OS
+# (only has an effect on databases created with auto_vacuum=INCREMENTAL)
+IDLE_VACUUM_SECONDS = 60
+IDLE_VACUUM_PAGES = 1000
+_write_queue = queue.Queue()
+_writer_thread = None
+_writer_lock = threading.Lock()
+
+
+def _ensure_analysis_writer() -> None:
+    """Start the analysis writer thread if it is not running"""
+    global _writer_thread
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_analysis_writer_loop, name='analysis-writer', daemon=True)
+            _writer_thread.start()
+
+
+def _analysis_writer_loop() -> None:
+    """Drain queued analyses and commit each batch in one transaction"""
+    while True:
+        try:
+            batch = [_write_queue.get(timeout=IDLE_VACUUM_SECONDS)]
+        except queue.Empty:
+            run_incremental_vacuum()
+            continue
+        deadline = time.monotonic() + WRITE_BATCH_WAIT_SECONDS
+        while len(batch) < WRITE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_write_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _write_analysis_batch(batch)
+
+
+def run_incremental_vacuum(pages: int = IDLE_VACUUM_PAGES) -> None:
+    """Release up to `pages` free pages from the database file"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        # The pragma frees one page per step, so drain it
+        conn.execute(f'PRAGMA incremental_vacuum({int(pages)})').fetchall()
+        conn.commit()
+    except Exception as e:
+        logger.warning(f"Incremental vacuum failed: {str(e)}")
+    finally:
+        release_db_connection(conn)
+
+
+def _write_analysis_batch(batch) -> None:
+    """Write a batch of (args, kwargs, future) jobs; a failed job only rolls back itself"""
+    # Skip jobs whose request gave up waiting; the rest can no longer be cancelled
+    batch = [job for job in batch if job[2].set_running_or_notify_cancel()]
+    if not batch:
+        return
+    
+    results = []
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        conn.execute('BEGIN IMMEDIATE')
+        for args, kwargs, future in batch:
+            cursor.execute('SAVEPOINT analysis')
+            try:
+                email_id = write_email_analysis(cursor, *args, **kwargs)
+                cursor.execute('RELEASE analysis')
             except Exception as e:
-                logger.warning(f"Failed to store URL analysis results: {e}")
-        
+                logger.error(f"Database storage error: {str(e)}")
+                cursor.execute('ROLLBACK TO analysis')
+                cursor.execute('RELEASE analysis')
+                email_id = None
+            results.append((future, email_id))
         conn.commit()
-        
-        # Log successful analysis (no PII)
-        log_msg = (f"Analysis complete [{request_id}]: "
-                   f"rule_score={detection_result.score}, "
-                   f"label={detection_result.label}, "
-                   f"evidence_count={len(detection_result.evidence)}")
-        
-        if ai_result:
-            log_msg += (f", ai_score={ai_result.score}, "
-                       f"ai_tokens={ai_result.tokens_used}, "
-                       f"ai_cost=${ai_result.cost_estimate:.4f}, "
-                       f"ai_success={ai_result.success}")
-        
-        if url_analysis:
-            summary = url_analysis['summary']
-            log_msg += (f", urls_analyzed={summary['total_urls']}, "
-                       f"malicious_urls={summary['malicious_urls']}, "
-                       f"avg_confidence={summary['average_confidence']}")
-        
-        logger.info(log_msg)
-        
-        return email_id
-        
     except Exception as e:
         logger.error(f"Database storage error: {str(e)}")
-        return None
+        if conn:
+            conn.rollback()
+        results = [(future, None) for _, _, future in batch]
     finally:
-        conn.close()
+        release_db_connection(conn)
+    
+    forget_cached_analyses([email_id for _, email_id in results if email_id])
+    for future, email_id in results:
+        future.set_result(email_id)
+
+
+def store_email_analysis(email_content, filename, parsed_email, detection_result, ai_result=None, url_analysis=None,
+                         email_hash=None, size_bytes=None):
+    """Store complete email analysis in database (includes AI results)"""
+    # Compress here, in the request thread, rather than in the writer's transaction
+    packed_html_body = pack_html_body(parsed_email.html_body)
+    
+    future = Future()
+    _ensure_analysis_writer()
+    _write_queue.put(((email_content, filename, parsed_email, detection_result, ai_result, url_analysis),
+                      {'email_hash': email_hash, 'size_bytes': size_bytes,
+                       'packed_html_body': packed_html_body}, future))
+    try:
+        return future.result(timeout=WRITE_RESULT_TIMEOUT_SECONDS)
+    except FuturesTimeout:
+        if future.cancel():
+            logger.error("Database storage error: timed out waiting for the analysis writer")
+            return None
+        # The writer already took the job; report what it commits
+        return future.result()
 
 
 def get_analysis_by_id(email_id):
     """Retrieve complete analysis by email ID (includes AI results)"""
+    conn = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         # Get email info and rule-based detection results (most recent analysis)
-        cursor.execute('''
-            SELECT e.*, d.score, d.label, d.confidence, d.evidence_json,
-                   d.processing_time_ms, d.rules_checked, d.rules_fired,
-                   d.created_at as analyzed_at
-            FROM emails e
-            JOIN detections d ON e.id = d.email_id
-            WHERE e.id = ?
-            ORDER BY d.created_at DESC
-            LIMIT 1
-        ''', (email_id,))
-        
-        row = cursor.fetchone()
+        row = conn.execute(ANALYSIS_EMAIL_SQL, (email_id,)).fetchone()
         if not row:
             return None
         
         # Get parsed content
-        cursor.execute('''
-            SELECT headers_json, text_body, html_as_text, urls_json,
-                   parse_time_ms, security_warnings
-            FROM email_parsed
-            WHERE email_id = ?
-        ''', (email_id,))
-        
-        parsed_row = cursor.fetchone()
+        parsed_row = conn.execute(ANALYSIS_PARSED_SQL, (email_id,)).fetchone()
         
         # Get AI analysis results if available
         ai_analysis = None
-        cursor.execute('''
-            SELECT score, label, evidence_json, tokens_used, cost_estimate,
-                   processing_time_ms, success, error_message, created_at
-            FROM ai_detections
-            WHERE email_id = ?
-            ORDER BY created_at DESC
-            LIMIT 1
-        ''', (email_id,))
-        
-        ai_row = cursor.fetchone()
+        ai_row = conn.execute(ANALYSIS_AI_SQL, (email_id,)).fetchone()
         if ai_row:
             ai_analysis = dict(ai_row)
         
+        email_info = dict(row)
+        # Hashes are stored as raw digests; present them as hex
+        if isinstance(email_info.get('sha256'), bytes):
+            email_info['sha256'] = email_info['sha256'].hex()
+        
         return {
-            'email': dict(row),
+            'email': email_info,
             'parsed': dict(parsed_row) if parsed_row else None,
             'ai_analysis': ai_analysis
         }
@@ -381,41 +795,247 @@ def get_analysis_by_id(email_id):
         logger.error(f"Analysis retrieval error: {str(e)}")
         return None
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+
+# Analyses with their JSON columns decoded, by email id, so repeat views of a
+# result page skip the full load and JSON parsing. Each entry keeps the
+# analysis version it was read at and is only served while the database
+# still reports that version, so writes by other worker processes are seen
+# at once. The writer also drops entries for analyses it stores.
+ANALYSIS_CACHE_SIZE = 256
+_analysis_cache = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_version(email_id):
+    """Current version of an email's analysis (one indexed lookup); None on error"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        return tuple(conn.execute(ANALYSIS_VERSION_SQL, (email_id, email_id)).fetchone())
+    except Exception as e:
+        logger.error(f"Analysis version lookup failed: {str(e)}")
+        return None
+    finally:
+        release_db_connection(conn)
+
+
+def decode_analysis(analysis, email_id):
+    """Parse the JSON columns of a get_analysis_by_id() result in place"""
+    analysis['email']['evidence'] = loads_json(analysis['email']['evidence_json'])
+    if analysis['parsed']:
+        analysis['parsed']['headers'] = loads_json(analysis['parsed']['headers_json'])
+        analysis['parsed']['urls'] = loads_json(analysis['parsed']['urls_json'])
+        analysis['parsed']['security_warnings'] = loads_json(analysis['parsed']['security_warnings'])
+    
+    #  Parse AI results if available
+    if analysis.get('ai_analysis'):
+        try:
+            analysis['ai_analysis']['evidence'] = loads_json(analysis['ai_analysis']['evidence_json'])
+        except (json.JSONDecodeError, KeyError) as e:
+            logger.error(f"AI JSON parsing error for analysis {email_id}: {str(e)}")
+            analysis['ai_analysis'] = None  # Remove invalid AI data
+    
+    return analysis
+
+
+def get_decoded_analysis(email_id):
+    """
+    Decoded analysis for the detail page (cached); None if not found
+    
+    Raises json.JSONDecodeError or KeyError if stored JSON is malformed.
+    """
+    # Read before loading: a write landing in between leaves the entry stale,
+    # and the next view reloads it
+    version = get_analysis_version(email_id)
+    
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(email_id)
+        if version is not None and cached is not None and cached[0] == version:
+            _analysis_cache.move_to_end(email_id)
+            return cached[1]
+    
+    analysis = get_analysis_by_id(email_id)
+    if not analysis:
+        return None
+    decode_analysis(analysis, email_id)
+    if version is None:
+        return analysis
+    
+    with _analysis_cache_lock:
+        _analysis_cache[email_id] = (version, analysis)
+        _analysis_cache.move_to_end(email_id)
+        if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+    return analysis
+
+
+def forget_cached_analyses(email_ids) -> None:
+    """Drop cached analyses for emails that have just been written"""
+    with _analysis_cache_lock:
+        for email_id in email_ids:
+            _analysis_cache.pop(email_id, None)
 
 
 def get_recent_analyses(limit=50):
     """Get recent analyses for listing page"""
+    conn = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT e.id, e.filename, e.size_bytes, e.uploaded_at,
-                   d.score, d.label, d.confidence, d.rules_fired
-            FROM emails e
-            JOIN (
-                SELECT email_id, score, label, confidence, rules_fired,
-                       ROW_NUMBER() OVER (PARTITION BY email_id ORDER BY created_at DESC) as rn
-                FROM detections
-            ) d ON e.id = d.email_id AND d.rn = 1
-            ORDER BY e.uploaded_at DESC
-            LIMIT ?
-        ''', (limit,))
-        
-        return [dict(row) for row in cursor.fetchall()]
+        try:
+            rows = conn.execute(RECENT_ANALYSES_SQL, (limit,)).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Latest detection columns unavailable, joining detections: {e}")
+            rows = conn.execute(RECENT_ANALYSES_JOIN_SQL, (limit,)).fetchall()
+        return [dict(row) for row in rows]
         
     except Exception as e:
         logger.error(f"Recent analyses retrieval error: {str(e)}")
         return []
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+
+# AI and URL reputation lookups are independent network calls; run them
+# concurrently so an upload waits for the slower one rather than both.
+ANALYSIS_WORKERS = 8
+AI_RESULT_TIMEOUT_SECONDS = 30
+URL_RESULT_TIMEOUT_SECONDS = 15
+_analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix='analysis')
+
+
+def run_ai_analysis(parsed_email, filename):
+    """AI analysis for an upload; None if it errors (rule-based results still stand)"""
+    try:
+        logger.info(f"Running AI analysis for '{filename}'")
+        ai_result = get_ai_batcher().analyze(parsed_email, timeout=AI_RESULT_TIMEOUT_SECONDS)
+        
+        if not ai_result.success:
+            logger.warning(f"AI analysis failed for '{filename}': {ai_result.error_message}")
+            # Continue with rule-based results only
+        
+        return ai_result
+    
+    except Exception as e:
+        logger.error(f"AI analysis error for '{filename}': {str(e)}")
+        import traceback
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+        return None
+
+
+def run_url_analysis(parsed_email, filename):
+    """URL reputation analysis for an upload's first 10 URLs; None if it errors"""
+    try:
+        logger.info(f"Running URL reputation analysis for '{filename}' ({len(parsed_email.urls)} URLs)")
+        url_service = get_url_reputation_service()
+        url_results = url_service.analyze_urls([url.normalized for url in parsed_email.urls[:10]])
+        url_analysis = {
+            # Results are flat dataclasses; a shallow copy avoids asdict()'s deep copy
+            'results': {url: dict(vars(result)) for url, result in url_results.items()},
+            'summary': url_service.get_reputation_summary(url_results)
+        }
+        logger.info(f"URL analysis completed: {url_analysis['summary']['malicious_urls']} malicious URLs found")
+        return url_analysis
+    
+    except Exception as e:
+        logger.error(f"URL reputation analysis failed for '{filename}': {e}")
+        return None
+
+
+def collect_analysis(future, timeout, description, filename):
+    """Wait for a submitted analysis; None if it has not finished within timeout"""
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=timeout)
+    except FuturesTimeout:
+        logger.error(f"{description} timed out after {timeout}s for '{filename}'")
+        return None
+
+
+# Monitoring endpoints and the stats page tolerate a few seconds of staleness:
+# the JSON endpoints serve their body from a short-lived cache instead of
+# re-running the aggregation on every poll, and clients may reuse responses
+MONITORING_CACHE_SECONDS = 5
+
+
+def ttl_cache(seconds: float, maxsize: int = 32):
+    """
+    Memoize a function's results by positional arguments for `seconds`
+    
+    Exceptions are not cached. When full, expired entries are dropped first,
+    then the oldest entry.
+    """
+    def decorator(func):
+        cache = OrderedDict()  # args -> (expires_at, result)
+        lock = threading.Lock()
+        
+        @functools.wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            entry = cache.get(args)
+            if entry is not None and now < entry[0]:
+                return entry[1]
+            
+            result = func(*args)
+            with lock:
+                cache[args] = (time.monotonic() + seconds, result)
+                cache.move_to_end(args)
+                if len(cache) > maxsize:
+                    for key in [key for key, (expires_at, _) in cache.items() if expires_at <= now]:
+                        del cache[key]
+                    while len(cache) > maxsize:
+                        cache.popitem(last=False)
+            return result
+        
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+def short_cache(seconds: int):
+    """
+    Let browsers and proxies reuse a successful GET response for `seconds`
+    
+    Adds Cache-Control max-age and a weak ETag, answering conditional
+    requests that still match with 304 Not Modified. Error responses and
+    pages rendered with pending flash messages are left uncached.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            has_flashes = bool(session.get('_flashes'))
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or has_flashes:
+                return response
+            
+            response.cache_control.public = True
+            response.cache_control.max_age = seconds
+            response.add_etag(weak=True)
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+# Rendered upload form, keyed by request.script_root
+_index_page_cache = {}
 
 
 @app.route('/')
 def index():
     """Main upload form page"""
-    return render_template('upload.html')
+    # Pending flash messages and debug template reloads need a fresh render
+    if app.debug or session.get('_flashes'):
+        return render_template('upload.html')
+    
+    # The page is otherwise static; cache it per mount point (url_for output)
+    script_root = request.script_root
+    page = _index_page_cache.get(script_root)
+    if page is None:
+        page = render_template('upload.html')
+        _index_page_cache[script_root] = page
+    return page
 
 
 @app.route('/upload', methods=['POST'])
@@ -440,20 +1060,27 @@ def upload_file():
         
         # Secure filename
         original_filename = file.filename
-        secure_name = secure_filename(original_filename)
+        secure_name = safe_upload_name(original_filename)
         
         if len(secure_name) > 255:
             flash('Filename too long', 'error')
             return redirect(request.url)
         
-        # Read and validate file content
-        email_content = file.read()
-        file.seek(0)
+        # Read and hash the upload in a single pass over the stream
+        email_content, email_hash = read_stream_with_hash(file.stream)
         
+        # Validate file content
         if not validate_file_content(file):
             flash('Invalid file format. Please ensure the file contains valid email content with proper headers and structure.', 'error')
             return redirect(request.url)
         
+        # Identical content was analyzed before; show the stored results
+        existing_id = find_existing_email(email_hash)
+        if existing_id is not None:
+            logger.info(f"Duplicate upload '{secure_name}' matches email ID {existing_id}, skipping analysis")
+            flash('This email has already been analyzed. Showing the existing results.', 'success')
+            return redirect(url_for('view_analysis', email_id=existing_id))
+        
         # Parse email with our parser
         try:
             parsed_email = parse_email_content(email_content, secure_name)
@@ -462,6 +1089,11 @@ def upload_file():
             logger.warning(f"Parsing failed for '{secure_name}': {str(e)}")
             return redirect(request.url)
         
+        # Only the parsed form is needed from here on; release the raw bytes
+        # rather than holding up to 25MB through the AI and URL lookups
+        size_bytes = len(email_content)
+        email_content = None
+        
         # Run rule-based detection
         try:
             detection_result = analyze_email(parsed_email)
@@ -470,42 +1102,19 @@ def upload_file():
             logger.error(f"Rule analysis failed for '{secure_name}': {str(e)}")
             return redirect(request.url)
         
-        # Run AI analysis if enabled
-        ai_result = None
+        # Run AI analysis (if enabled) and URL reputation analysis (if Phase 4 is enabled) concurrently
+        ai_future = None
         if AI_ENABLED:
-            try:
-                logger.info(f"Running AI analysis for '{secure_name}'")
-                
-                # AI analysis is working - debug code removed
-                
-                ai_result = analyze_email_with_ai(parsed_email)
-                
-                if not ai_result.success:
-                    logger.warning(f"AI analysis failed for '{secure_name}': {ai_result.error_message}")
-                    # Continue with rule-based results only
-                    
-            except Exception as e:
-                logger.error(f"AI analysis error for '{secure_name}': {str(e)}")
-                import traceback
-                logger.error(f"Full traceback: {traceback.format_exc()}")
-                # Continue with rule-based results only
+            ai_future = _analysis_executor.submit(run_ai_analysis, parsed_email, secure_name)
         else:
             logger.debug("AI analysis skipped - not enabled")
         
-        # Run URL reputation analysis if Phase 4 is enabled
-        url_analysis = None
+        url_future = None
         if PHASE4_ENABLED and parsed_email.urls:
-            try:
-                logger.info(f"Running URL reputation analysis for '{secure_name}' ({len(parsed_email.urls)} URLs)")
-                url_service = get_url_reputation_service()
-                url_results = url_service.analyze_urls([url.normalized for url in parsed_email.urls[:10]])
-                url_analysis = {
-                    'results': {url: asdict(result) for url, result in url_results.items()},
-                    'summary': url_service.get_reputation_summary(url_results)
-                }
-                logger.info(f"URL analysis completed: {url_analysis['summary']['malicious_urls']} malicious URLs found")
-            except Exception as e:
-                logger.error(f"URL reputation analysis failed for '{secure_name}': {e}")
+            url_future = _analysis_executor.submit(run_url_analysis, parsed_email, secure_name)
+        
+        ai_result = collect_analysis(ai_future, AI_RESULT_TIMEOUT_SECONDS, 'AI analysis', secure_name)
+        url_analysis = collect_analysis(url_future, URL_RESULT_TIMEOUT_SECONDS, 'URL reputation analysis', secure_name)
         
         # Record performance metrics if Phase 4 is enabled
         if PHASE4_ENABLED:
@@ -520,7 +1129,8 @@ def upload_file():
                 logger.debug(f"Performance metric recording failed: {e}")
         
         # Store results in database (rule-based, AI, and URL analysis)
-        email_id = store_email_analysis(email_content, secure_name, parsed_email, detection_result, ai_result, url_analysis)
+        email_id = store_email_analysis(email_content, secure_name, parsed_email, detection_result, ai_result, url_analysis,
+                                        email_hash=email_hash, size_bytes=size_bytes)
         
         if email_id:
             flash(f'Email analyzed successfully!', 'success')
@@ -542,33 +1152,17 @@ def upload_file():
 @app.route('/analysis/<int:email_id>')
 def view_analysis(email_id):
     """Display detailed analysis results"""
-    analysis = get_analysis_by_id(email_id)
-    
-    if not analysis:
-        flash('Analysis not found', 'error')
-        return redirect(url_for('index'))
-    
-    # Parse JSON data for display
     try:
-        analysis['email']['evidence'] = json.loads(analysis['email']['evidence_json'])
-        if analysis['parsed']:
-            analysis['parsed']['headers'] = json.loads(analysis['parsed']['headers_json'])
-            analysis['parsed']['urls'] = json.loads(analysis['parsed']['urls_json'])
-            analysis['parsed']['security_warnings'] = json.loads(analysis['parsed']['security_warnings'])
-        
-        #  Parse AI results if available
-        if analysis.get('ai_analysis'):
-            try:
-                analysis['ai_analysis']['evidence'] = json.loads(analysis['ai_analysis']['evidence_json'])
-            except (json.JSONDecodeError, KeyError) as e:
-                logger.error(f"AI JSON parsing error for analysis {email_id}: {str(e)}")
-                analysis['ai_analysis'] = None  # Remove invalid AI data
-                
+        analysis = get_decoded_analysis(email_id)
     except (json.JSONDecodeError, KeyError) as e:
         logger.error(f"JSON parsing error for analysis {email_id}: {str(e)}")
         flash('Error displaying analysis results', 'error')
         return redirect(url_for('index'))
     
+    if not analysis:
+        flash('Analysis not found', 'error')
+        return redirect(url_for('index'))
+    
     return render_template('analysis.html', analysis=analysis)
 
 
@@ -579,7 +1173,16 @@ def list_analyses():
     return render_template('analyses.html', analyses=analyses)
 
 
+def fetch_stats_rows(cursor, total_sql, label_sql, daily_sql):
+    """Run the stats page queries; returns (total row, label rows, daily rows)"""
+    total_row = cursor.execute(total_sql).fetchone()
+    label_rows = cursor.execute(label_sql).fetchall()
+    daily_rows = cursor.execute(daily_sql).fetchall()
+    return total_row, label_rows, daily_rows
+
+
 @app.route('/stats')
+@short_cache(MONITORING_CACHE_SECONDS)
 def stats():
     """Display system statistics with Current AI data"""
     conn = None
@@ -587,57 +1190,35 @@ def stats():
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Get total analyses
-        cursor.execute('SELECT COUNT(*) FROM emails')
-        total_analyses = cursor.fetchone()[0]
+        # Totals, per-label and daily counts from the trigger-maintained counters
+        try:
+            total_row, label_rows, daily_rows = fetch_stats_rows(
+                cursor, STATS_TOTAL_SQL, STATS_LABEL_SQL, STATS_DAILY_SQL)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Stats counters unavailable, scanning tables: {e}")
+            total_row, label_rows, daily_rows = fetch_stats_rows(
+                cursor, STATS_TOTAL_SCAN_SQL, STATS_LABEL_SCAN_SQL, STATS_DAILY_SCAN_SQL)
+        
+        total_analyses = total_row[0]
         logger.info(f"Total analyses: {total_analyses}")
         
-        # Get analyses by label
-        cursor.execute('''
-            SELECT label, COUNT(*) as count
-            FROM detections
-            GROUP BY label
-            ORDER BY count DESC
-        ''')
         label_stats = []
-        for row in cursor.fetchall():
-            label_stats.append({'label': row['label'], 'count': row['count']})
-        logger.info(f"Label stats: {label_stats}")
-        
-        # Get average score by label
-        cursor.execute('''
-            SELECT label, AVG(score) as avg_score, COUNT(*) as count
-            FROM detections
-            GROUP BY label
-        ''')
         score_stats = []
-        for row in cursor.fetchall():
+        for row in label_rows:
+            label_stats.append({'label': row['label'], 'count': row['count']})
             score_stats.append({'label': row['label'], 'avg_score': row['avg_score'], 'count': row['count']})
+        logger.info(f"Label stats: {label_stats}")
         logger.info(f"Score stats: {score_stats}")
         
-        # Get daily stats
-        cursor.execute('''
-            SELECT DATE(uploaded_at) as date, COUNT(*) as count
-            FROM emails 
-            WHERE uploaded_at >= date('now', '-7 days')
-            GROUP BY DATE(uploaded_at)
-            ORDER BY date DESC
-        ''')
         daily_stats = []
-        for row in cursor.fetchall():
+        for row in daily_rows:
             daily_stats.append({'date': row['date'], 'count': row['count']})
         logger.info(f"Daily stats: {daily_stats}")
         
         #  Get AI usage stats
         ai_stats = None
         try:
-            cursor.execute('''
-                SELECT SUM(requests_count) as total_requests,
-                       SUM(tokens_used) as total_tokens,
-                       SUM(total_cost) as total_cost
-                FROM ai_usage_stats
-                WHERE date >= date('now', '-30 days')
-            ''')
+            cursor.execute(STATS_AI_TOTALS_SQL)
             ai_row = cursor.fetchone()
             
             if ai_row and ai_row[0]:  # If there are AI stats
@@ -648,12 +1229,7 @@ def stats():
                 }
                 
                 # Get recent daily AI usage
-                cursor.execute('''
-                    SELECT date, requests_count, tokens_used, total_cost
-                    FROM ai_usage_stats
-                    WHERE date >= date('now', '-7 days')
-                    ORDER BY date DESC
-                ''')
+                cursor.execute(STATS_AI_DAILY_SQL)
                 ai_stats['daily'] = []
                 for row in cursor.fetchall():
                     ai_stats['daily'].append({
@@ -681,34 +1257,68 @@ def stats():
         flash('Error retrieving statistics', 'error')
         return redirect(url_for('index'))
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
+
+
+# Healthy /health responses are served from cache between full checks
+HEALTH_CACHE_SECONDS = 5
+_health_cache = None  # (expires_at, response body)
 
 
 @app.route('/health')
 def health_check():
+    """Health endpoint; re-runs the full check at most every HEALTH_CACHE_SECONDS"""
+    global _health_cache
+    
+    cached = _health_cache
+    if cached is not None and time.monotonic() < cached[0]:
+        return app.response_class(cached[1], status=200, mimetype='application/json')
+    
+    response, status_code = run_health_check()
+    # Only healthy results are cached so failures are re-checked on every probe
+    if status_code == 200:
+        _health_cache = (time.monotonic() + HEALTH_CACHE_SECONDS, response.get_data())
+    else:
+        _health_cache = None
+    return response, status_code
+
+
+PHASE3_TABLES = ('emails', 'email_parsed', 'detections', 'ai_detections', 'ai_usage_stats')
+HEALTH_TABLES_SQL = (
+    "SELECT name FROM sqlite_master WHERE type='table' AND name IN (%s)"
+    % ', '.join(f"'{table}'" for table in PHASE3_TABLES)
+)
+HEALTH_AI_COUNT_SQL = 'SELECT COALESCE(SUM(requests_count), 0) FROM ai_usage_stats'
+
+
+def run_health_check():
     """Enhanced health check for Current with AI service status"""
+    conn = None
     try:
         conn = get_db_connection()
         
-        # Test database connectivity
+        # Test database connectivity; the email total comes from the
+        # trigger-maintained daily counts, as on the stats page, with the same
+        # fallback for databases created before the counter tables
         cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM emails')
+        try:
+            cursor.execute(STATS_TOTAL_SQL)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Stats counters unavailable, counting emails: {e}")
+            cursor.execute(STATS_TOTAL_SCAN_SQL)
         email_count = cursor.fetchone()[0]
         
-        # Check Current tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [row[0] for row in cursor.fetchall()]
+        # Check Current tables (only the ones we need, not the whole catalog)
+        cursor.execute(HEALTH_TABLES_SQL)
+        tables = {row[0] for row in cursor.fetchall()}
+        missing_tables = [t for t in PHASE3_TABLES if t not in tables]
         
-        phase3_tables = ['emails', 'email_parsed', 'detections', 'ai_detections', 'ai_usage_stats']
-        missing_tables = [t for t in phase3_tables if t not in tables]
-        
-        # Get AI analysis count
+        # AI analyses run, from the per-day usage totals (a few rows, not a scan)
         ai_count = 0
         try:
-            cursor.execute('SELECT COUNT(*) FROM ai_detections')
+            cursor.execute(HEALTH_AI_COUNT_SQL)
             ai_count = cursor.fetchone()[0]
-        except:
+        except sqlite3.Error:
             pass
         
         # Test parser and rule engine
@@ -717,11 +1327,8 @@ def health_check():
         ai_status = "disabled"
         
         try:
-            from services.parser import EmailParser
-            from services.rules import RuleEngine
-            
             parser = EmailParser()
-            engine = RuleEngine()
+            engine = get_rule_engine()
             rules_count = len(engine.rules)
             
         except Exception as e:
@@ -749,7 +1356,6 @@ def health_check():
         health_data = {
             'status': 'healthy' if not missing_tables else 'degraded',
             'version': '3.0.0',
-            'timestamp': datetime.now().isoformat(),
             'database': {
                 'emails': email_count,
                 'ai_analyses': ai_count,
@@ -763,7 +1369,12 @@ def health_check():
             }
         }
         
-        status_code = 200 if health_data['status'] == 'healthy' else 503
+        # Only failing probes carry a timestamp; the healthy path skips it
+        if health_data['status'] == 'healthy':
+            status_code = 200
+        else:
+            health_data['timestamp'] = datetime.now().isoformat()
+            status_code = 503
         
         return jsonify(health_data), status_code
         
@@ -773,9 +1384,8 @@ def health_check():
             'error': str(e),
             'timestamp': datetime.now().isoformat()
         }), 503
-    
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 
 # ==================== Phase 4 Routes ====================
@@ -795,13 +1405,17 @@ def create_batch_job():
         if not files:
             return jsonify({'error': 'No files provided'}), 400
             
-        # Prepare email files
+        # Prepare email files; streams are copied to the job directory in
+        # chunks rather than read into memory first
         email_files = []
         for file in files:
             if file.filename and allowed_file(file.filename):
-                content = file.read()
-                if len(content) > 0:
-                    email_files.append((file.filename, content))
+                # SpooledTemporaryFile.seek() returns None before Python 3.11
+                file.stream.seek(0, os.SEEK_END)
+                size = file.stream.tell()
+                file.stream.seek(0)
+                if size > 0:
+                    email_files.append((file.filename, file.stream))
         
         if not email_files:
             return jsonify({'error': 'No valid email files found'}), 400
@@ -838,7 +1452,7 @@ def get_batch_status(job_id):
         if not status:
             return jsonify({'error': 'Job not found'}), 404
             
-        return jsonify(asdict(status))
+        return jsonify(status)
         
     except Exception as e:
         logger.error(f"Failed to get batch status: {e}")
@@ -888,65 +1502,105 @@ def create_export_request():
             export_type, data_type, reference_id, settings
         )
         
-        # Process the export synchronously for now
-        result = export_service.process_export_request(request_id)
+        # Generate in the background; clients poll the status endpoint
+        export_service.submit_export_request(request_id)
         
         return jsonify({
             'request_id': request_id,
-            'status': result.status,
-            'file_path': result.file_path if result.status == 'completed' else None,
-            'error_message': result.error_message
-        })
+            'status': 'pending',
+            'status_url': url_for('get_export_status', request_id=request_id)
+        }), 202
         
     except Exception as e:
         logger.error(f"Export request failed: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/export/<request_id>')
+def get_export_status(request_id):
+    """Get export request status"""
+    if not PHASE4_ENABLED:
+        return jsonify({'error': 'Phase 4 features not available'}), 503
+        
+    try:
+        export_service = get_export_service()
+        status = export_service.get_export_status(request_id)
+        
+        if not status:
+            return jsonify({'error': 'Export request not found'}), 404
+            
+        return jsonify({
+            'request_id': request_id,
+            'status': status['status'],
+            'file_path': status['file_path'] if status['status'] == 'completed' else None,
+            'error_message': status['error_message']
+        })
+        
+    except Exception as e:
+        logger.error(f"Failed to get export status: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def cached_json_response(body: bytes):
+    """JSON response for a body serialized by one of the cached helpers below"""
+    return app.response_class(body, mimetype=app.json.mimetype)
+
+
+@ttl_cache(MONITORING_CACHE_SECONDS)
+def performance_summary_json(hours: int) -> bytes:
+    """Serialized performance summary for the last `hours` hours"""
+    summary = get_performance_monitor().get_performance_summary(hours)
+    return jsonify(summary).get_data()
+
+
+@ttl_cache(MONITORING_CACHE_SECONDS)
+def system_health_json() -> bytes:
+    """Serialized system health metrics"""
+    return jsonify(get_performance_monitor().collect_system_metrics()).get_data()
+
+
+@ttl_cache(MONITORING_CACHE_SECONDS)
+def cache_stats_json() -> bytes:
+    """Serialized cache statistics"""
+    return jsonify(get_cache_manager().get_stats()).get_data()
+
+
 @app.route('/api/performance')
+@short_cache(MONITORING_CACHE_SECONDS)
 def get_performance_metrics():
     """Get system performance metrics"""
     if not PHASE4_ENABLED:
         return jsonify({'error': 'Phase 4 features not available'}), 503
         
     try:
-        performance_monitor = get_performance_monitor()
-        
         hours = request.args.get('hours', 24, type=int)
-        summary = performance_monitor.get_performance_summary(hours)
-        
-        return jsonify(summary)
+        return cached_json_response(performance_summary_json(hours))
         
     except Exception as e:
         logger.error(f"Failed to get performance metrics: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/performance/health')
+@short_cache(MONITORING_CACHE_SECONDS)
 def get_system_health():
     """Get detailed system health status"""
     if not PHASE4_ENABLED:
         return jsonify({'error': 'Phase 4 features not available'}), 503
         
     try:
-        performance_monitor = get_performance_monitor()
-        health = performance_monitor.collect_system_metrics()
-        
-        return jsonify(asdict(health))
+        return cached_json_response(system_health_json())
         
     except Exception as e:
         logger.error(f"Failed to get system health: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/cache/stats')  
+@short_cache(MONITORING_CACHE_SECONDS)
 def get_cache_stats():
     """Get cache performance statistics"""
     if not PHASE4_ENABLED:
         return jsonify({'error': 'Phase 4 features not available'}), 503
         
     try:
-        cache_manager = get_cache_manager()
-        stats = cache_manager.get_stats()
-        
-        return jsonify(stats)
+        return cached_json_response(cache_stats_json())
         
     except Exception as e:
         logger.error(f"Failed to get cache stats: {e}")
@@ -970,15 +1624,10 @@ def analyze_urls():
         url_service = get_url_reputation_service()
         results = url_service.analyze_urls(urls[:10])  # Limit to 10 URLs
         
-        # Convert results to serializable format
-        serializable_results = {}
-        for url, result in results.items():
-            serializable_results[url] = asdict(result)
-            
         summary = url_service.get_reputation_summary(results)
         
         return jsonify({
-            'results': serializable_results,
+            'results': results,  # Dataclasses serialize natively
             'summary': summary
         })
         
@@ -1031,16 +1680,16 @@ if __name__ == '__main__':
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
         
-        # Check Current tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='emails'")
-        if not cursor.fetchone():
+        # Check Current tables with a single catalog lookup
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('emails', 'ai_detections')")
+        tables = {row[0] for row in cursor.fetchall()}
+        
+        if 'emails' not in tables:
             print("Current tables not found. Please run:")
             print("python migrate_to_phase2.py")
             exit(1)
         
-        # Check Current tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='ai_detections'")
-        if not cursor.fetchone():
+        if 'ai_detections' not in tables:
             print("Current tables not found. Please run:")
             print("python migrate_to_phase3.py")
             exit(1)
@@ -9,6 +9,7 @@ This script creates the base schema that the Flask app expects to exist.
 import sqlite3
 import os
 import logging
+import zlib
 from datetime import datetime
 
 # Configure logging
@@ -17,11 +18,51 @@ logger = logging.getLogger(__name__)
 
 DATABASE_PATH = 'data/phishing_analyzer.db'
 
+# Same level app.py uses for newly stored bodies (HTML_BODY_COMPRESSION_LEVEL)
+HTML_BODY_COMPRESSION_LEVEL = 6
+
+# Larger pages suit the multi-KB JSON and body columns; only applies to a new file
+PAGE_SIZE = 16384
+
 def ensure_data_directory():
     """Ensure the data directory exists"""
     os.makedirs('data', exist_ok=True)
     logger.info("Data directory ensured")
 
+def configure_page_size(conn, existing_tables):
+    """Set the page size on a fresh database, before any table is created"""
+    if existing_tables:
+        logger.info("Database already has tables, keeping its page size")
+        return
+    conn.execute(f"PRAGMA page_size = {PAGE_SIZE}")
+    logger.info(f"Page size set to {PAGE_SIZE} bytes")
+
+def configure_auto_vacuum(conn, existing_tables):
+    """
+    Use incremental auto-vacuum on a fresh database
+
+    Like the page size, the setting is fixed once the first table is written;
+    changing it later needs a full VACUUM. The app releases free pages with
+    PRAGMA incremental_vacuum while it is idle.
+    """
+    if existing_tables:
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        logger.info(f"Database already has tables, keeping auto_vacuum mode {mode}")
+        return
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    logger.info("Auto-vacuum set to INCREMENTAL")
+
+def configure_journal_mode(conn):
+    """Switch the database to WAL; the mode is stored in the file, so app connections inherit it"""
+    mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+    if mode != "wal":
+        logger.warning(f"Could not enable WAL journal mode (using {mode})")
+        return
+    # synchronous is per connection: NORMAL here covers this script's own
+    # commits, and the app's pooled connections set it themselves
+    conn.execute("PRAGMA synchronous=NORMAL")
+    logger.info("Journal mode set to WAL")
+
 def create_base_tables(conn):
     """Create base tables required by the Flask application"""
     cursor = conn.cursor()
@@ -32,9 +73,14 @@ def create_base_tables(conn):
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             filename TEXT NOT NULL,
             size_bytes INTEGER NOT NULL,
-            sha256 TEXT NOT NULL UNIQUE,
+            sha256 BLOB NOT NULL UNIQUE,  -- Raw 32-byte SHA-256 digest
             parse_summary_json TEXT,
-            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Latest detection, maintained by trigger (see create_latest_detection_columns)
+            latest_score INTEGER,
+            latest_label TEXT,
+            latest_confidence REAL,
+            latest_rules_fired INTEGER
         )
     """)
     
@@ -45,7 +91,7 @@ def create_base_tables(conn):
             email_id INTEGER NOT NULL,
             headers_json TEXT,
             text_body TEXT,
-            html_body TEXT,
+            html_body TEXT,  -- zlib-compressed UTF-8 BLOB when non-empty (app.unpack_html_body)
             html_as_text TEXT,
             urls_json TEXT,
             parse_time_ms INTEGER,
@@ -104,7 +150,7 @@ def create_base_tables(conn):
             tokens_used INTEGER DEFAULT 0,
             total_cost REAL DEFAULT 0.0,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+        ) WITHOUT ROWID
     """)
     
     logger.info("Created base application tables")
@@ -113,27 +159,183 @@ def create_indexes(conn):
     """Create indexes for better performance"""
     cursor = conn.cursor()
     
-    # Indexes for emails table
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_emails_sha256 ON emails(sha256)")
+    # Indexes for emails table (sha256 lookups use its UNIQUE constraint's index)
+    cursor.execute("DROP INDEX IF EXISTS idx_emails_sha256")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_emails_uploaded ON emails(uploaded_at)")
     
     # Indexes for email_parsed table
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_email_parsed_email_id ON email_parsed(email_id)")
     
     # Indexes for detections table
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_detections_email_id ON detections(email_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_detections_score ON detections(score)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_detections_created ON detections(created_at)")
+    # Latest detection per email; also serves plain email_id lookups
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_detections_email_created ON detections(email_id, created_at DESC)")
+    cursor.execute("DROP INDEX IF EXISTS idx_detections_email_id")
+    # No query filters or sorts detections by score or created_at alone
+    cursor.execute("DROP INDEX IF EXISTS idx_detections_score")
+    cursor.execute("DROP INDEX IF EXISTS idx_detections_created")
+    # Covering index for the stats page label breakdown
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_detections_label_score ON detections(label, score)")
     
     # Indexes for ai_detections table
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_ai_detections_email_id ON ai_detections(email_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_ai_detections_created ON ai_detections(created_at)")
     
-    # Index for ai_usage_stats
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ai_usage_date ON ai_usage_stats(date)")
+    # ai_usage_stats is looked up by its primary key, which is already indexed
+    cursor.execute("DROP INDEX IF EXISTS idx_ai_usage_date")
     
     logger.info("Created performance indexes")
 
+def create_stats_counters(conn):
+    """Create counter tables kept current by triggers, so /stats avoids full scans"""
+    cursor = conn.cursor()
+    
+    # Like ai_usage_stats, the counters are keyed by text and only ever
+    # accessed by that key, so they are stored WITHOUT ROWID: one B-tree per
+    # table instead of a rowid table plus a separate primary key index
+    
+    # Detection count and score total per label
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            label TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0,
+            sum_score INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    
+    # Uploaded emails per day
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_counts (
+            date TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_detections_count_insert
+        AFTER INSERT ON detections
+        BEGIN
+            INSERT INTO stats_counters (label, count, sum_score) VALUES (NEW.label, 1, NEW.score)
+            ON CONFLICT(label) DO UPDATE SET count = count + 1, sum_score = sum_score + excluded.sum_score;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_detections_count_delete
+        AFTER DELETE ON detections
+        BEGIN
+            UPDATE stats_counters SET count = count - 1, sum_score = sum_score - OLD.score
+            WHERE label = OLD.label;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_emails_count_insert
+        AFTER INSERT ON emails
+        BEGIN
+            INSERT INTO daily_counts (date, count) VALUES (DATE(NEW.uploaded_at), 1)
+            ON CONFLICT(date) DO UPDATE SET count = count + 1;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_emails_count_delete
+        AFTER DELETE ON emails
+        BEGIN
+            UPDATE daily_counts SET count = count - 1 WHERE date = DATE(OLD.uploaded_at);
+        END
+    """)
+    
+    logger.info("Created stats counter tables and triggers")
+
+def rebuild_stats_counters(conn):
+    """Recount the stats counters from the detections and emails tables"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM stats_counters")
+    cursor.execute("""
+        INSERT INTO stats_counters (label, count, sum_score)
+        SELECT label, COUNT(*), SUM(score) FROM detections GROUP BY label
+    """)
+    cursor.execute("DELETE FROM daily_counts")
+    cursor.execute("""
+        INSERT INTO daily_counts (date, count)
+        SELECT DATE(uploaded_at), COUNT(*) FROM emails GROUP BY DATE(uploaded_at)
+    """)
+    logger.info("Rebuilt stats counters")
+
+# Columns on emails holding a copy of the email's most recent detection
+LATEST_DETECTION_COLUMNS = (
+    ("latest_score", "INTEGER"),
+    ("latest_label", "TEXT"),
+    ("latest_confidence", "REAL"),
+    ("latest_rules_fired", "INTEGER"),
+)
+
+LATEST_DETECTION_SELECT = """
+    SELECT score, label, confidence, rules_fired FROM detections
+    WHERE email_id = emails.id
+    ORDER BY created_at DESC, id DESC
+    LIMIT 1
+"""
+
+def create_latest_detection_columns(conn):
+    """Keep each email's latest detection on the emails row, so the listing page needs no join"""
+    cursor = conn.cursor()
+    
+    # Databases created before these columns existed
+    existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(emails)")}
+    for name, column_type in LATEST_DETECTION_COLUMNS:
+        if name not in existing_columns:
+            cursor.execute(f"ALTER TABLE emails ADD COLUMN {name} {column_type}")
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_detections_latest_insert
+        AFTER INSERT ON detections
+        BEGIN
+            UPDATE emails
+            SET latest_score = NEW.score, latest_label = NEW.label,
+                latest_confidence = NEW.confidence, latest_rules_fired = NEW.rules_fired
+            WHERE id = NEW.email_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_detections_latest_delete
+        AFTER DELETE ON detections
+        BEGIN
+            UPDATE emails
+            SET (latest_score, latest_label, latest_confidence, latest_rules_fired) = ({LATEST_DETECTION_SELECT})
+            WHERE id = OLD.email_id;
+        END
+    """)
+    
+    # Seed from existing detections
+    cursor.execute(f"""
+        UPDATE emails
+        SET (latest_score, latest_label, latest_confidence, latest_rules_fired) = ({LATEST_DETECTION_SELECT})
+        WHERE latest_label IS NULL
+    """)
+    
+    logger.info("Created latest detection columns and triggers")
+
+def convert_hex_hashes(conn):
+    """Convert email hashes stored as 64-char hex text to raw 32-byte digests"""
+    conn.create_function("unhex_digest", 1, bytes.fromhex, deterministic=True)
+    cursor = conn.cursor()
+    cursor.execute("UPDATE emails SET sha256 = unhex_digest(sha256) WHERE typeof(sha256) = 'text'")
+    if cursor.rowcount:
+        logger.info(f"Converted {cursor.rowcount} email hashes to binary digests")
+
+def compress_html_bodies(conn):
+    """Compress HTML bodies stored as plain text by older versions"""
+    conn.create_function(
+        "compress_html", 1,
+        lambda html: zlib.compress(html.encode("utf-8"), HTML_BODY_COMPRESSION_LEVEL),
+        deterministic=True
+    )
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE email_parsed SET html_body = compress_html(html_body)
+        WHERE typeof(html_body) = 'text' AND html_body != ''
+    """)
+    if cursor.rowcount:
+        logger.info(f"Compressed {cursor.rowcount} stored HTML bodies")
+
 def check_existing_tables(conn):
     """Check what tables already exist"""
     cursor = conn.cursor()
@@ -161,12 +363,41 @@ def run_base_schema_creation():
         # Check existing structure
         existing_tables = check_existing_tables(conn)
         
+        # Page size must be chosen before the first table is written
+        configure_page_size(conn, existing_tables)
+        configure_auto_vacuum(conn, existing_tables)
+        
+        # WAL must follow the page size, which cannot change once in WAL mode
+        configure_journal_mode(conn)
+        
+        # Index builds sort in temp storage; keep it and their pages in memory
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")  # ~64 MB
+        
+        # sqlite3 autocommits DDL statement by statement; run the whole schema
+        # in one transaction so it commits (and syncs) once, or not at all
+        conn.execute("BEGIN")
+        
         # Create base tables
         create_base_tables(conn)
         
         # Create indexes
         create_indexes(conn)
         
+        # Bring hashes written by older versions to the binary format
+        convert_hex_hashes(conn)
+        compress_html_bodies(conn)
+        
+        # Trigger-maintained counters for the stats page, seeded from existing rows
+        create_stats_counters(conn)
+        rebuild_stats_counters(conn)
+        
+        # Latest detection per email, copied onto emails for the listing page
+        create_latest_detection_columns(conn)
+        
+        # Refresh planner statistics for the current set of indexes
+        conn.execute("ANALYZE")
+        
         # Commit all changes
         conn.commit()
         
@@ -10,6 +10,7 @@ New features:
 - Enhanced reporting capabilities
 """
 
+import hashlib
 import sqlite3
 import os
 import sys
@@ -49,7 +50,7 @@ def create_url_analysis_table(conn):
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS url_analysis (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            url_hash TEXT NOT NULL UNIQUE,  -- SHA256 hash of URL for privacy
+            url_hash BLOB NOT NULL UNIQUE,  -- Raw SHA256 digest of URL for privacy
             original_url TEXT NOT NULL,     -- Original URL (for reference)
             is_malicious BOOLEAN NOT NULL DEFAULT 0,
             threat_types TEXT,              -- JSON array of threat types
@@ -71,6 +72,18 @@ def create_url_analysis_table(conn):
     
     logger.info("Created url_analysis table with indexes")
 
+def convert_url_hashes(conn):
+    """
+    Replace legacy text url_hash values (truncated URLs) with SHA256 digests
+    """
+    conn.create_function(
+        "url_digest", 1, lambda url: hashlib.sha256(url.encode()).digest(), deterministic=True
+    )
+    cursor = conn.cursor()
+    cursor.execute("UPDATE url_analysis SET url_hash = url_digest(original_url) WHERE typeof(url_hash) = 'text'")
+    if cursor.rowcount:
+        logger.info(f"Converted {cursor.rowcount} URL hashes to binary digests")
+
 def create_batch_jobs_table(conn):
     """
     Create table for tracking batch processing jobs
@@ -203,49 +216,32 @@ def create_export_requests_table(conn):
     
     logger.info("Created export_requests table with indexes")
 
+# Phase 4 columns added to email_analysis, as (name, type, purpose)
+EMAIL_ANALYSIS_COLUMNS = (
+    ("url_analysis_summary", "TEXT", "URL analysis reference"),
+    ("processing_time_ms", "INTEGER", "performance tracking"),
+    ("cache_hit_rate", "REAL", "performance tracking"),
+    ("ai_explanation", "TEXT", "enhanced AI analysis"),
+    ("confidence_calibration", "REAL", "enhanced AI analysis"),
+)
+
 def enhance_existing_tables(conn):
     """
     Add Phase 4 enhancements to existing tables
     """
     cursor = conn.cursor()
     
-    # Add URL analysis reference to email_analysis table
-    try:
-        cursor.execute("ALTER TABLE email_analysis ADD COLUMN url_analysis_summary TEXT")
-        logger.info("Added url_analysis_summary column to email_analysis table")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" not in str(e).lower():
-            logger.warning(f"Could not add url_analysis_summary column: {e}")
-
-    # Add performance tracking columns
-    try:
-        cursor.execute("ALTER TABLE email_analysis ADD COLUMN processing_time_ms INTEGER")
-        logger.info("Added processing_time_ms column to email_analysis table")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" not in str(e).lower():
-            logger.warning(f"Could not add processing_time_ms column: {e}")
-
-    try:
-        cursor.execute("ALTER TABLE email_analysis ADD COLUMN cache_hit_rate REAL")
-        logger.info("Added cache_hit_rate column to email_analysis table")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" not in str(e).lower():
-            logger.warning(f"Could not add cache_hit_rate column: {e}")
-
-    # Add enhanced AI analysis columns
-    try:
-        cursor.execute("ALTER TABLE email_analysis ADD COLUMN ai_explanation TEXT")
-        logger.info("Added ai_explanation column to email_analysis table")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" not in str(e).lower():
-            logger.warning(f"Could not add ai_explanation column: {e}")
-
-    try:
-        cursor.execute("ALTER TABLE email_analysis ADD COLUMN confidence_calibration REAL")
-        logger.info("Added confidence_calibration column to email_analysis table")
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" not in str(e).lower():
-            logger.warning(f"Could not add confidence_calibration column: {e}")
+    # Read the table's columns once instead of probing with failing ALTERs
+    existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(email_analysis)")}
+    if not existing_columns:
+        logger.warning("email_analysis table not found, skipping column enhancements")
+        return
+    
+    for name, column_type, purpose in EMAIL_ANALYSIS_COLUMNS:
+        if name in existing_columns:
+            continue
+        cursor.execute(f"ALTER TABLE email_analysis ADD COLUMN {name} {column_type}")
+        logger.info(f"Added {name} column to email_analysis table ({purpose})")
 
 def create_views_for_reporting(conn):
     """
@@ -318,11 +314,27 @@ def run_migration():
         conn = sqlite3.connect(DATABASE_PATH)
         conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
         
+        # WAL is persistent, so databases created by older versions pick it up here
+        if conn.execute("PRAGMA journal_mode=WAL").fetchone()[0] == "wal":
+            conn.execute("PRAGMA synchronous=NORMAL")
+            logger.info("Journal mode set to WAL")
+        else:
+            logger.warning("Could not enable WAL journal mode")
+        
+        # Index builds sort in temp storage; keep it and their pages in memory
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")  # ~64 MB
+        
+        # sqlite3 autocommits DDL statement by statement; run the migration
+        # in one transaction so it commits (and syncs) once, or not at all
+        conn.execute("BEGIN")
+        
         # Check existing structure
         existing_tables = check_existing_tables(conn)
         
         # Create new tables
         create_url_analysis_table(conn)
+        convert_url_hashes(conn)
         create_batch_jobs_table(conn)
         create_batch_job_emails_table(conn)
         create_performance_metrics_table(conn)
@@ -334,6 +346,17 @@ def run_migration():
         # Create reporting views
         create_views_for_reporting(conn)
         
+        # Record the migration in the same transaction as the schema changes
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO performance_metrics 
+            (metric_type, metric_name, value, unit, component, context)
+            VALUES ('migration', 'phase4_migration_success', 1, 'boolean', 'migration_script', '{"version": "4.0", "timestamp": "' + ? + '"}')
+        """, (datetime.now().isoformat(),))
+        
+        # Planner statistics for the new tables and indexes
+        conn.execute("ANALYZE")
+        
         # Commit all changes
         conn.commit()
         
@@ -344,15 +367,6 @@ def run_migration():
         logger.info(f"Migration completed successfully!")
         logger.info(f"Added {len(new_tables)} new tables: {sorted(new_tables)}")
         
-        # Insert a test performance metric to verify the setup
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO performance_metrics 
-            (metric_type, metric_name, value, unit, component, context)
-            VALUES ('migration', 'phase4_migration_success', 1, 'boolean', 'migration_script', '{"version": "4.0", "timestamp": "' + ? + '"}')
-        """, (datetime.now().isoformat(),))
-        conn.commit()
-        
         conn.close()
         
         logger.info("Phase 4 migration completed successfully! 🚀")
@@ -267,6 +267,18 @@ Evidence IDs should be uppercase with underscores (e.g., SPF_FAIL, SUSPICIOUS_UR
 
         return None, 0, "Max retries exceeded"
 
+    def build_prompt(self, parsed_email: ParsedEmail) -> str:
+        """
+        Build the prompt an email is analyzed with, truncated to the token limit
+
+        Args:
+            parsed_email: Parsed email data
+
+        Returns:
+            Prompt string sent to the model
+        """
+        return self._truncate_prompt(self._create_analysis_prompt(parsed_email))
+
     def analyze_email(self, parsed_email: ParsedEmail) -> AIAnalysisResult:
         """
         Analyze email for phishing using GPT-4o-mini
@@ -281,8 +293,7 @@ Evidence IDs should be uppercase with underscores (e.g., SPF_FAIL, SUSPICIOUS_UR
 
         try:
             # Create and truncate prompt
-            prompt = self._create_analysis_prompt(parsed_email)
-            prompt = self._truncate_prompt(prompt)
+            prompt = self.build_prompt(parsed_email)
 
             # Make API request with fallback handling
             response_data, tokens_used, error = self._make_api_request_with_fallback(prompt)
@@ -0,0 +1,235 @@
+"""
+AI Request Batcher - Performance Enhancement
+Micro-batching of concurrent AI analysis requests
+
+While analyses are in flight, requests that arrive within a short window
+are collected and dispatched together as parallel chat-completion calls,
+with the number of in-flight OpenAI requests capped. A request arriving
+when the batcher is idle is dispatched at once. Requests in a batch whose
+prompt is identical share a single call; only the first of them is
+credited with its tokens and cost.
+"""
+
+import dataclasses
+import hashlib
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from .ai import AIAnalysisResult, analyze_email_with_ai, get_ai_analyzer
+from .parser import ParsedEmail
+
+logger = logging.getLogger(__name__)
+
+# Micro-batch configuration
+AI_BATCH_SIZE = 8  # Requests collected per batch
+AI_BATCH_WINDOW_SECONDS = 0.15  # How long the first request waits for others
+AI_MAX_CONCURRENT_REQUESTS = 10  # Parallel chat-completion calls
+
+
+def prompt_key(parsed_email: ParsedEmail) -> Optional[str]:
+    """
+    Digest of the prompt an email would be analyzed with
+
+    Returns:
+        SHA-256 hex digest, or None if the AI analyzer is unavailable
+    """
+    try:
+        analyzer = get_ai_analyzer()
+    except Exception:
+        return None
+    prompt = analyzer.build_prompt(parsed_email)
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class AIBatcher:
+    """Collects AI analysis requests into micro-batches and runs them in parallel"""
+
+    def __init__(
+        self,
+        batch_size: int = AI_BATCH_SIZE,
+        window_seconds: float = AI_BATCH_WINDOW_SECONDS,
+        max_concurrent: int = AI_MAX_CONCURRENT_REQUESTS,
+        analyze: Callable[[ParsedEmail], AIAnalysisResult] = analyze_email_with_ai,
+        key: Callable[[ParsedEmail], Optional[str]] = prompt_key,
+    ):
+        """
+        Initialize the batcher
+
+        Args:
+            batch_size: Maximum requests dispatched per batch
+            window_seconds: How long to wait for a batch to fill
+            max_concurrent: Maximum concurrent analysis calls
+            analyze: Function performing a single analysis
+            key: Function returning a coalescing key for a request (None = never coalesce)
+        """
+        self.batch_size = batch_size
+        self.window_seconds = window_seconds
+        self._analyze = analyze
+        self._key = key
+
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="ai-request")
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._in_flight = 0  # Analysis calls dispatched but not finished
+        self._stats = {"submitted": 0, "batches": 0, "coalesced": 0}
+
+    def submit(self, parsed_email: ParsedEmail) -> "Future[AIAnalysisResult]":
+        """Queue an email for AI analysis; the returned Future holds the result"""
+        if self._closed:
+            raise RuntimeError("AI batcher is closed")
+
+        future = Future()
+        self._ensure_dispatcher()
+        self._queue.put((parsed_email, future))
+        return future
+
+    def analyze(self, parsed_email: ParsedEmail, timeout: Optional[float] = None) -> AIAnalysisResult:
+        """Submit an email and wait for its analysis"""
+        return self.submit(parsed_email).result(timeout=timeout)
+
+    def _ensure_dispatcher(self):
+        """Start the dispatcher thread if it is not running"""
+        if self._dispatcher is not None and self._dispatcher.is_alive():
+            return
+        with self._lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(
+                    target=self._dispatch_loop, name="ai-batcher", daemon=True
+                )
+                self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        """Collect queued requests into batches until closed"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            if self._queue.empty() and not self._in_flight:
+                # Idle: nothing to batch with, so don't make the request wait
+                self._dispatch(batch)
+                continue
+
+            deadline = time.monotonic() + self.window_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+            if item is None:
+                break
+
+        self._executor.shutdown(wait=False)
+
+    def _dispatch(self, batch: List):
+        """Run one batch, issuing a single call per distinct prompt"""
+        groups: Dict[object, tuple] = {}
+        for parsed_email, future in batch:
+            try:
+                key = self._key(parsed_email)
+            except Exception as e:
+                logger.debug(f"AI request key failed, not coalescing: {e}")
+                key = None
+            if key is None:
+                key = id(future)
+            groups.setdefault(key, (parsed_email, []))[1].append(future)
+
+        with self._lock:
+            self._stats["submitted"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["coalesced"] += len(batch) - len(groups)
+            self._in_flight += len(groups)
+
+        if len(groups) < len(batch):
+            logger.info(f"AI batch of {len(batch)} requests coalesced into {len(groups)} calls")
+
+        for parsed_email, futures in groups.values():
+            self._executor.submit(self._run, parsed_email, futures)
+
+    def _run(self, parsed_email: ParsedEmail, futures: List[Future]):
+        """Analyze one email and resolve every Future waiting on it"""
+        try:
+            result = self._analyze(parsed_email)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        futures[0].set_result(result)
+        if len(futures) > 1:
+            # Every caller stores its result, so only one may carry the call's usage
+            shared = _without_usage(result)
+            for future in futures[1:]:
+                future.set_result(shared)
+
+    def get_stats(self) -> Dict:
+        """Batching statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+    def close(self):
+        """Stop the dispatcher once queued requests are dispatched"""
+        with self._lock:
+            self._closed = True
+            dispatcher = self._dispatcher
+        if dispatcher is not None and dispatcher.is_alive():
+            self._queue.put(None)
+        else:
+            self._executor.shutdown(wait=False)
+
+
+def _without_usage(result):
+    """Copy of a shared analysis result with its token usage and cost zeroed"""
+    if isinstance(result, AIAnalysisResult):
+        return dataclasses.replace(result, tokens_used=0, cost_estimate=0.0)
+    return result
+
+
+# Global batcher instance (initialized when needed)
+_batcher_instance = None
+_batcher_lock = threading.Lock()
+
+
+def get_ai_batcher() -> AIBatcher:
+    """
+    Get global AI batcher instance
+
+    Returns:
+        AIBatcher instance
+    """
+    global _batcher_instance
+    if _batcher_instance is None:
+        with _batcher_lock:
+            if _batcher_instance is None:
+                _batcher_instance = AIBatcher()
+    return _batcher_instance
+
+
+def reset_ai_batcher():
+    """Close and reset the global batcher instance (mainly for testing)"""
+    global _batcher_instance
+    with _batcher_lock:
+        if _batcher_instance is not None:
+            _batcher_instance.close()
+        _batcher_instance = None
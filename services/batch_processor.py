@@ -9,6 +9,7 @@ with progress tracking, result aggregation, and error handling.
 import json
 import logging
 import os
+import shutil
 import sqlite3
 import tempfile
 import time
@@ -17,7 +18,7 @@ import zipfile
 from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
 
 # Celery imports
 try:
@@ -29,7 +30,9 @@ except ImportError:
 
 from services.ai import analyze_email_with_ai
 # Import our core services
-from services.parser import EmailParsingError, parse_email_content
+from services.json_provider import dumps_json, loads_json
+from services.parser import (HASH_CHUNK_SIZE, EmailParsingError, get_email_hash,
+                             parse_email_content, read_stream_with_hash)
 from services.rules import analyze_email
 
 logger = logging.getLogger(__name__)
@@ -125,13 +128,14 @@ class BatchProcessor:
         return conn
 
     def create_batch_job(self, 
-                        email_files: List[Tuple[str, bytes]], 
+                        email_files: List[Tuple[str, Union[bytes, BinaryIO]]], 
                         config: BatchJobConfig) -> str:
         """
         Create a new batch processing job
         
         Args:
-            email_files: List of (filename, file_content) tuples
+            email_files: List of (filename, content) tuples; content is bytes or a
+                binary stream (e.g. an upload), which is copied to disk in chunks
             config: Job configuration
             
         Returns:
@@ -151,12 +155,16 @@ class BatchProcessor:
                 file_path = job_upload_dir / safe_filename
                 
                 with open(file_path, 'wb') as f:
-                    f.write(content)
+                    if isinstance(content, (bytes, bytearray, memoryview)):
+                        f.write(content)
+                    else:
+                        shutil.copyfileobj(content, f, HASH_CHUNK_SIZE)
+                    file_size = f.tell()
                 
                 stored_files.append({
                     'original_filename': filename,
                     'stored_path': str(file_path),
-                    'file_size': len(content)
+                    'file_size': file_size
                 })
             
             # Create database record
@@ -171,7 +179,7 @@ class BatchProcessor:
                     VALUES (?, ?, ?, 0, 0, ?, ?, ?)
                 """, (
                     job_id, 'pending', len(email_files),
-                    config.priority, json.dumps(asdict(config)),
+                    config.priority, dumps_json(config),
                     datetime.now().isoformat()
                 ))
                 
@@ -244,11 +252,10 @@ class BatchProcessor:
         start_time = time.time()
         
         try:
-            # Read and parse email
+            # Read and hash the stored file in one pass (mmap, no extra copy)
             with open(file_path, 'rb') as f:
-                email_content = f.read()
+                email_content, email_hash = read_stream_with_hash(f)
             
-            email_hash = self._get_file_hash(email_content)
             parsed_email = parse_email_content(email_content)
             
             # Rule-based analysis
@@ -298,8 +305,7 @@ class BatchProcessor:
 
     def _get_file_hash(self, content: bytes) -> str:
         """Generate hash for email content"""
-        import hashlib
-        return hashlib.sha256(content).hexdigest()
+        return get_email_hash(content)
 
     def _update_job_status(self, job_id: str, status: str, error_message: Optional[str] = None):
         """Update job status in database"""
@@ -368,7 +374,7 @@ class BatchProcessor:
                     completed_at = ?,
                     results = ?
                 WHERE id = ?
-            """, (datetime.now().isoformat(), json.dumps(results_summary), job_id))
+            """, (datetime.now().isoformat(), dumps_json(results_summary), job_id))
             
             conn.commit()
             
@@ -428,7 +434,7 @@ class BatchProcessor:
             row = cursor.fetchone()
             
             if row and row['results']:
-                results_data = json.loads(row['results'])
+                results_data = loads_json(row['results'])
                 return results_data.get('results', [])
                 
         finally:
@@ -558,6 +564,13 @@ if CELERY_AVAILABLE and celery_app:
         """Celery task to process a single email"""
         processor = BatchProcessor()
         return processor._process_single_email_sync(file_path, filename, BatchJobConfig(**config))
+    
+    @celery_app.task
+    def process_export(request_id: str) -> Dict:
+        """Celery task to generate a report export"""
+        from services.report_export import get_export_service
+        result = get_export_service().process_export_request(request_id)
+        return {'status': result.status, 'file_path': result.file_path}
 
 
 # Global batch processor instance
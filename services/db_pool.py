@@ -0,0 +1,218 @@
+"""
+Database Connection Pool - Performance Enhancement
+Bounded pool of long-lived SQLite connections in WAL mode
+
+Connections are opened once and handed out per request, so SQLite's
+page cache stays warm across requests instead of being rebuilt by a
+fresh connect/close on every handler.
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Per-connection settings applied once when a connection is created
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-20000',  # ~20 MB page cache per pooled connection
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA journal_size_limit=67108864',  # Truncate WAL to 64 MB after checkpoints
+)
+
+# WAL size that triggers an automatic checkpoint. wal_autocheckpoint counts
+# pages, so the page count is derived from the database's page size to keep
+# the WAL well under journal_size_limit whatever page size the file uses.
+WAL_CHECKPOINT_BYTES = 32 * 1024 * 1024
+
+# Prepared statements kept per connection (sqlite3 defaults to 128); room for
+# every distinct query the app and services issue on a shared connection
+STATEMENT_CACHE_SIZE = 256
+
+
+def default_pool_size() -> int:
+    """Pool size from DB_POOL_SIZE, else min(32, 4 x CPU count)"""
+    configured = os.getenv('DB_POOL_SIZE')
+    if configured:
+        return max(1, int(configured))
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections
+    Connections are created lazily up to max_size and reused afterwards
+    """
+
+    def __init__(self, db_path: str, max_size: Optional[int] = None, timeout: float = 30.0):
+        self.db_path = db_path
+        self.max_size = max_size or default_pool_size()
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue(maxsize=self.max_size)  # LIFO keeps the warmest connection in use
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        logger.info(f"Connection pool for {db_path} (max {self.max_size} connections)")
+
+    def _create_connection(self) -> sqlite3.Connection:
+        """Open and configure a new pooled connection"""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        conn.execute(f'PRAGMA wal_autocheckpoint={WAL_CHECKPOINT_BYTES // page_size}')
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Take a connection from the pool, opening one if the pool is not full
+
+        Raises:
+            sqlite3.OperationalError: If no connection frees up within the timeout
+        """
+        if self._closed:
+            raise sqlite3.OperationalError("Connection pool is closed")
+
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_usable(conn):
+                return conn
+            logger.warning("Replacing unusable pooled connection")
+            self._discard(conn)
+
+        with self._lock:
+            can_create = self._created < self.max_size
+            if can_create:
+                self._created += 1
+
+        if can_create:
+            try:
+                return self._create_connection()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Timed out waiting for a database connection ({self.max_size} in use)"
+            )
+        if self._is_usable(conn):
+            return conn
+        logger.warning("Replacing unusable pooled connection")
+        self._discard(conn)
+        return self.acquire()
+
+    @staticmethod
+    def _is_usable(conn: sqlite3.Connection) -> bool:
+        """Check out-of-band closed or broken connections before handing them out"""
+        try:
+            conn.execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def release(self, conn: Optional[sqlite3.Connection]):
+        """Return a connection to the pool, rolling back any open transaction"""
+        if conn is None:
+            return
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding pooled connection after failed rollback: {e}")
+            self._discard(conn)
+            return
+
+        if self._closed:
+            self._discard(conn)
+            return
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        """Close a connection and free its slot"""
+        with self._lock:
+            self._created -= 1
+        try:
+            # Refresh planner statistics the connection found stale
+            conn.execute('PRAGMA optimize')
+        except sqlite3.Error:
+            pass
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Context manager that acquires a connection and always releases it"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close idle connections; connections still in use close on release"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def get_stats(self) -> Dict:
+        """Pool usage statistics"""
+        return {
+            'db_path': self.db_path,
+            'max_size': self.max_size,
+            'created': self._created,
+            'idle': self._idle.qsize(),
+        }
+
+
+# Global pools, one per database file
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_db_pool(db_path: Optional[str] = None) -> ConnectionPool:
+    """Get the shared connection pool for a database file"""
+    db_path = db_path or os.getenv('DATABASE_PATH', 'data/phishing_analyzer.db')
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = ConnectionPool(db_path)
+                _pools[db_path] = pool
+    return pool
+
+def reset_db_pools():
+    """Close and forget all pools (mainly for testing)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
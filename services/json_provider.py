@@ -0,0 +1,94 @@
+"""
+JSON Provider - Fast serialization for API responses
+
+Plugs orjson into Flask's JSON provider interface when it is installed,
+keeping the output compatible with Flask's default provider. Also provides
+dumps_json/loads_json for the JSON columns written with each analysis.
+"""
+
+import dataclasses
+import functools
+import json
+import logging
+from typing import Any, Tuple
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson
+
+    Keys are sorted and datetimes are passed through to Flask's default
+    handler (RFC 822 dates), so responses match DefaultJSONProvider apart
+    from non-ASCII text being emitted as UTF-8 rather than escaped.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize with orjson, falling back to json for unsupported options"""
+        indent = kwargs.get("indent")
+        if set(kwargs) - {"indent", "separators"} or indent not in (None, 2):
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode()
+        except TypeError:
+            # e.g. integers beyond 64 bits, which the stdlib encoder handles
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """Deserialize with orjson unless json-specific options are given"""
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+@functools.lru_cache(maxsize=None)
+def _field_names(cls: type) -> Tuple[str, ...]:
+    """Field names of a dataclass type"""
+    return tuple(field.name for field in dataclasses.fields(cls))
+
+
+def _storage_default(obj: Any) -> Any:
+    """Stdlib json default hook mirroring orjson's dataclass and datetime support"""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        # One level only: the encoder calls back here for nested dataclasses,
+        # so there is no need for asdict()'s recursive deep copy
+        return {name: getattr(obj, name) for name in _field_names(type(obj))}
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(obj: Any) -> str:
+    """
+    Serialize a value for a JSON text column
+
+    Dataclasses are serialized directly (no asdict() copy) and datetimes as
+    ISO 8601 strings. Uses orjson when installed, otherwise the stdlib.
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            # e.g. lone surrogates or integers beyond 64 bits
+            pass
+    return json.dumps(obj, default=_storage_default)
+
+
+def loads_json(s: Any) -> Any:
+    """Deserialize a JSON column value written by dumps_json (or json.dumps)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(s)
+    return json.loads(s)
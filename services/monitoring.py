@@ -9,6 +9,7 @@ insights for optimization and troubleshooting.
 import json
 import logging
 import os
+import queue
 import sqlite3
 import threading
 import time
@@ -22,6 +23,19 @@ import psutil
 
 logger = logging.getLogger(__name__)
 
+# Metric rows are written off the request path in batches of up to this many
+# rows per transaction instead of one connect/INSERT/commit per call.
+METRIC_WRITE_BATCH_SIZE = 100
+METRIC_WRITE_POLL_SECONDS = 0.05
+METRIC_FLUSH_TIMEOUT_SECONDS = 5  # Longest a reader waits for queued metrics
+
+INSERT_METRIC_SQL = """
+    INSERT INTO performance_metrics
+    (metric_type, metric_name, value, unit, component, context,
+     recorded_at, session_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 @dataclass
 class PerformanceMetric:
     """Individual performance measurement"""
@@ -83,6 +97,11 @@ class PerformanceMonitor:
         # Background monitoring thread
         self._monitoring_thread = None
         self._monitoring_active = False
+
+        # Background metric writer
+        self._write_queue = queue.Queue()
+        self._writer_thread = None
+        self._writer_lock = threading.Lock()
         
         logger.info(f"PerformanceMonitor initialized with session: {self.session_id}")
 
@@ -111,7 +130,7 @@ class PerformanceMonitor:
             context: Additional context data
             
         Returns:
-            True if recorded successfully
+            True if the metric was queued for writing
         """
         try:
             metric = PerformanceMetric(
@@ -124,29 +143,77 @@ class PerformanceMonitor:
                 session_id=self.session_id
             )
             
-            conn = self._get_db_connection()
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO performance_metrics 
-                    (metric_type, metric_name, value, unit, component, context, 
-                     recorded_at, session_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    metric.metric_type, metric.metric_name, metric.value,
-                    metric.unit, metric.component, json.dumps(metric.context),
-                    metric.recorded_at.isoformat(), metric.session_id
-                ))
-                conn.commit()
-                return True
-                
-            finally:
-                conn.close()
+            self._ensure_writer()
+            self._write_queue.put((
+                metric.metric_type, metric.metric_name, metric.value,
+                metric.unit, metric.component, json.dumps(metric.context),
+                metric.recorded_at.isoformat(), metric.session_id
+            ))
+            return True
                 
         except Exception as e:
             logger.error(f"Failed to record metric {metric_name}: {e}")
             return False
 
+    def _ensure_writer(self):
+        """Start the background metric writer thread if it is not running"""
+        if self._writer_thread is not None and self._writer_thread.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer_thread is None or not self._writer_thread.is_alive():
+                self._writer_thread = threading.Thread(
+                    target=self._metric_writer_loop,
+                    name='metric-writer',
+                    daemon=True
+                )
+                self._writer_thread.start()
+
+    def _metric_writer_loop(self):
+        """Drain queued metrics, committing up to a batch per transaction"""
+        conn = None
+        while True:
+            batch = [self._write_queue.get()]
+            while len(batch) < METRIC_WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._write_queue.get(timeout=METRIC_WRITE_POLL_SECONDS))
+                except queue.Empty:
+                    break
+            try:
+                # (Re)open inside the guard so a failed connect drops this
+                # batch instead of killing the writer thread
+                if conn is None:
+                    conn = self._get_db_connection()
+                with conn:
+                    conn.executemany(INSERT_METRIC_SQL, batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} metrics: {e}")
+                if conn is not None:
+                    conn.close()
+                    conn = None
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    def flush_metrics(self, timeout: float = METRIC_FLUSH_TIMEOUT_SECONDS) -> bool:
+        """
+        Wait until every queued metric has been written
+        
+        Returns:
+            False if the writer did not catch up within timeout
+        """
+        if self._writer_thread is None:
+            return True
+        deadline = time.monotonic() + timeout
+        pending = self._write_queue.all_tasks_done
+        with pending:
+            while self._write_queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._writer_thread.is_alive():
+                    logger.warning(f"Metric flush gave up with {self._write_queue.unfinished_tasks} metrics pending")
+                    return False
+                pending.wait(min(remaining, 0.5))
+        return True
+
     @contextmanager
     def measure_time(self, metric_name: str, component: str, context: Optional[Dict] = None):
         """
@@ -297,6 +364,7 @@ class PerformanceMonitor:
         """
         try:
             since_time = datetime.now() - timedelta(hours=hours)
+            self.flush_metrics()
             
             conn = self._get_db_connection()
             try:
@@ -370,6 +438,7 @@ class PerformanceMonitor:
     def get_latest_metrics(self) -> Dict:
         """Get the most recent metrics for each type"""
         try:
+            self.flush_metrics()
             conn = self._get_db_connection()
             try:
                 cursor = conn.cursor()
@@ -559,4 +628,5 @@ def reset_performance_monitor():
     global _performance_monitor
     if _performance_monitor:
         _performance_monitor.stop_background_monitoring()
+        _performance_monitor.flush_metrics()
     _performance_monitor = None
\ No newline at end of file
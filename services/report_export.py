@@ -12,7 +12,9 @@ import logging
 import os
 import sqlite3
 import tempfile
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -47,6 +49,9 @@ except (ImportError, OSError) as e:
 
 logger = logging.getLogger(__name__)
 
+# Exports generated concurrently in-process when Celery is unavailable
+EXPORT_WORKERS = 2
+
 @dataclass
 class ExportRequest:
     """Export request configuration"""
@@ -93,6 +98,10 @@ class ReportExportService:
         # PDF configuration
         self.pdf_available = REPORTLAB_AVAILABLE or WEASYPRINT_AVAILABLE
         
+        # Background generation (created on first submit)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        
         logger.info(f"ReportExportService initialized - PDF: {self.pdf_available}")
 
     def _get_db_connection(self) -> sqlite3.Connection:
@@ -144,6 +153,33 @@ class ReportExportService:
             logger.error(f"Failed to create export request: {e}")
             raise ReportExportError(f"Export request creation failed: {e}")
 
+    def submit_export_request(self, request_id: str):
+        """
+        Generate an export in the background
+        
+        Queued on the Celery workers when available, otherwise (or if the
+        broker cannot be reached) run on a small in-process thread pool.
+        Poll get_export_status() for the outcome.
+        
+        Args:
+            request_id: Export request ID
+        """
+        from services.batch_processor import CELERY_AVAILABLE, celery_app
+        if CELERY_AVAILABLE and celery_app:
+            from services.batch_processor import process_export
+            try:
+                process_export.delay(request_id)
+                logger.info(f"Export request {request_id} submitted to Celery")
+                return
+            except Exception as e:
+                logger.warning(f"Celery submission failed, exporting {request_id} in-process: {e}")
+        
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS,
+                                                    thread_name_prefix='report-export')
+        self._executor.submit(self.process_export_request, request_id)
+
     def process_export_request(self, request_id: str) -> ExportResult:
         """
         Process an export request
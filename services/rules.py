@@ -7,6 +7,7 @@ architecture and comprehensive evidence tracking.
 
 import logging
 import re
+import threading
 import time
 import unicodedata
 from dataclasses import dataclass
@@ -612,6 +613,19 @@ class RuleEngine:
         }
 
 
+# Rule engines hold no per-email state, so each thread builds one and reuses it
+_engine_local = threading.local()
+
+
+def get_rule_engine() -> RuleEngine:
+    """Get the rule engine for the current thread, creating it on first use"""
+    engine = getattr(_engine_local, "engine", None)
+    if engine is None:
+        engine = RuleEngine()
+        _engine_local.engine = engine
+    return engine
+
+
 # Convenience function for external use
 def analyze_email(parsed_email: ParsedEmail) -> DetectionResult:
     """
@@ -623,5 +637,4 @@ def analyze_email(parsed_email: ParsedEmail) -> DetectionResult:
     Returns:
         DetectionResult with analysis results
     """
-    engine = RuleEngine()
-    return engine.analyze_email(parsed_email)
+    return get_rule_engine().analyze_email(parsed_email)
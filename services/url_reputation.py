@@ -10,16 +10,25 @@ import hashlib
 import json
 import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from urllib.parse import quote_plus, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+# Outbound lookups: concurrent VirusTotal requests and transient-error retries
+MAX_CONCURRENT_LOOKUPS = 10
+HTTP_RETRY_ATTEMPTS = 3  # Including the first attempt
+HTTP_RETRY_BACKOFF = 0.5  # Seconds, doubled after each retry
+
 @dataclass
 class URLAnalysisResult:
     """Structured result from URL reputation analysis"""
@@ -47,6 +56,13 @@ class URLReputationService:
         self.cache_duration_hours = int(os.getenv('URL_CACHE_DURATION_HOURS', '24'))
         self.rate_limit_delay = float(os.getenv('URL_API_DELAY_SECONDS', '1.0'))
         self.last_api_call = 0
+        self._rate_lock = threading.Lock()
+        
+        # Keep-alive connections shared by all lookups, and a bounded pool for
+        # the per-URL VirusTotal requests
+        self.session = self._create_session()
+        self._lookup_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LOOKUPS,
+                                               thread_name_prefix='url-lookup')
         
         # API endpoints
         self.gsb_endpoint = "https://safebrowsing.googleapis.com/v4/threatMatches:find"
@@ -54,12 +70,29 @@ class URLReputationService:
         
         logger.info(f"URLReputationService initialized with GSB: {'✓' if self.gsb_api_key else '✗'}, VT: {'✓' if self.vt_api_key else '✗'}")
 
+    def _create_session(self) -> requests.Session:
+        """HTTP session with connection pooling and exponential-backoff retries"""
+        retry = Retry(
+            total=HTTP_RETRY_ATTEMPTS - 1,
+            backoff_factor=HTTP_RETRY_BACKOFF,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'POST'}),  # Both lookups are read-only
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_maxsize=MAX_CONCURRENT_LOOKUPS, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
     def _rate_limit(self):
-        """Implement rate limiting between API calls"""
-        elapsed = time.time() - self.last_api_call
-        if elapsed < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - elapsed)
-        self.last_api_call = time.time()
+        """Implement rate limiting between API calls (safe across threads)"""
+        with self._rate_lock:
+            now = time.time()
+            slot = max(now, self.last_api_call + self.rate_limit_delay)
+            self.last_api_call = slot
+        if slot > now:
+            time.sleep(slot - now)
 
     def _get_url_hash(self, url: str) -> str:
         """Generate consistent hash for URL caching"""
@@ -102,7 +135,7 @@ class URLReputationService:
         }
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.gsb_endpoint}?key={self.gsb_api_key}",
                 headers={'Content-Type': 'application/json'},
                 json=request_body,
@@ -170,7 +203,7 @@ class URLReputationService:
         }
 
         try:
-            response = requests.get(self.vt_endpoint, params=params, timeout=10)
+            response = self.session.get(self.vt_endpoint, params=params, timeout=10)
             response.raise_for_status()
             
             result_data = response.json()
@@ -217,6 +250,13 @@ class URLReputationService:
             logger.error(f"Unexpected error in VT analysis: {e}")
             raise URLReputationError(f"VT analysis failed: {e}")
 
+    def _check_virustotal_or_none(self, url: str) -> Optional[URLAnalysisResult]:
+        """VirusTotal lookup for the lookup pool; None if the request failed"""
+        try:
+            return self._check_virustotal(url)
+        except URLReputationError:
+            return None  # Other URLs are still checked
+
     def analyze_urls(self, urls: List[str], use_cache: bool = True) -> Dict[str, URLAnalysisResult]:
         """
         Analyze multiple URLs using available threat intelligence sources
@@ -238,8 +278,8 @@ class URLReputationService:
         if use_cache:
             # Import cache manager here to avoid circular imports
             try:
-                from services.cache_manager import CacheManager
-                cache = CacheManager()
+                from services.cache_manager import get_cache_manager
+                cache = get_cache_manager()
                 
                 for url in urls:
                     cache_key = f"url_reputation:{self._get_url_hash(url)}"
@@ -280,22 +320,21 @@ class URLReputationService:
             remaining_urls = [url for url in uncached_urls if url not in results]
             
             if remaining_urls and self.vt_api_key:
-                for url in remaining_urls[:5]:  # Limit VT calls due to rate limits
-                    try:
-                        vt_result = self._check_virustotal(url)
-                        if vt_result:
-                            results[url] = vt_result
-                            
-                            # Cache result
-                            if use_cache:
-                                try:
-                                    cache_key = f"url_reputation:{self._get_url_hash(url)}"
-                                    cache.set(cache_key, vt_result.__dict__,
-                                            expire_hours=self.cache_duration_hours)
-                                except:
-                                    pass
-                    except URLReputationError:
-                        continue  # Try next URL
+                vt_urls = remaining_urls[:5]  # Limit VT calls due to rate limits
+                # Requests start rate_limit_delay apart but overlap in flight
+                vt_results = self._lookup_pool.map(self._check_virustotal_or_none, vt_urls)
+                for url, vt_result in zip(vt_urls, vt_results):
+                    if vt_result:
+                        results[url] = vt_result
+                        
+                        # Cache result
+                        if use_cache:
+                            try:
+                                cache_key = f"url_reputation:{self._get_url_hash(url)}"
+                                cache.set(cache_key, vt_result.__dict__,
+                                        expire_hours=self.cache_duration_hours)
+                            except:
+                                pass
 
             # For any remaining URLs, create default results
             for url in uncached_urls:
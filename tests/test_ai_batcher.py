@@ -0,0 +1,103 @@
+"""
+Unit tests for AI request micro-batching
+"""
+
+import threading
+import time
+import pytest
+from services.ai import AIAnalysisResult
+from services.ai_batcher import AIBatcher
+
+
+class TestAIBatcher:
+    """Test cases for AIBatcher"""
+
+    def setup_method(self):
+        """Track calls made through a fake analysis function"""
+        self.calls = []
+        self.calls_lock = threading.Lock()
+        self.gate = threading.Event()
+
+    def analyze(self, email):
+        """Fake analysis that records each call"""
+        with self.calls_lock:
+            self.calls.append(email)
+        if email == 'boom':
+            raise RuntimeError('analysis failed')
+        if email == 'slow':
+            self.gate.wait(5)
+        return f'result:{email}'
+
+    def make_batcher(self, **kwargs):
+        """Batcher keyed on the email itself"""
+        return AIBatcher(analyze=self.analyze, key=lambda email: email, **kwargs)
+
+    def test_results_returned_per_request(self):
+        """Each submitted email gets its own result"""
+        batcher = self.make_batcher(window_seconds=0.05)
+        futures = {email: batcher.submit(email) for email in ('a', 'b', 'c')}
+
+        for email, future in futures.items():
+            assert future.result(timeout=5) == f'result:{email}'
+        batcher.close()
+
+    def test_identical_requests_are_coalesced(self):
+        """Identical prompts in one batch share a single analysis call"""
+        batcher = self.make_batcher(window_seconds=0.5)
+        slow = batcher.submit('slow')  # Keeps the batcher busy so the rest are batched
+        futures = [batcher.submit('same') for _ in range(4)]
+
+        assert [f.result(timeout=5) for f in futures] == ['result:same'] * 4
+        assert self.calls.count('same') == 1
+        assert batcher.get_stats()['coalesced'] == 3
+        self.gate.set()
+        slow.result(timeout=5)
+        batcher.close()
+
+    def test_idle_request_is_not_delayed(self):
+        """A request arriving while nothing is in flight skips the batch window"""
+        batcher = self.make_batcher(window_seconds=5)
+
+        start = time.monotonic()
+        assert batcher.analyze('a', timeout=5) == 'result:a'
+        assert time.monotonic() - start < 1
+        batcher.close()
+
+    def test_coalesced_usage_is_counted_once(self):
+        """Only one caller sharing an analysis call is credited with its tokens and cost"""
+        result = AIAnalysisResult(score=80, label='Phishing', evidence=[], tokens_used=120,
+                                  cost_estimate=0.002, processing_time_ms=5.0, success=True)
+
+        def analyze(email):
+            if email == 'slow':
+                self.gate.wait(5)
+            return result
+
+        batcher = AIBatcher(analyze=analyze, key=lambda email: email, window_seconds=0.5)
+        slow = batcher.submit('slow')
+        futures = [batcher.submit('same') for _ in range(3)]
+        results = [f.result(timeout=5) for f in futures]
+
+        assert sum(r.tokens_used for r in results) == 120
+        assert sum(r.cost_estimate for r in results) == 0.002
+        assert {r.score for r in results} == {80}
+        self.gate.set()
+        slow.result(timeout=5)
+        batcher.close()
+
+    def test_unkeyed_requests_are_not_coalesced(self):
+        """Requests without a key always get their own call"""
+        batcher = AIBatcher(analyze=self.analyze, key=lambda email: None, window_seconds=0.5)
+        futures = [batcher.submit('same') for _ in range(3)]
+
+        assert [f.result(timeout=5) for f in futures] == ['result:same'] * 3
+        assert len(self.calls) == 3
+        batcher.close()
+
+    def test_analysis_errors_propagate(self):
+        """A failing analysis raises from the request's Future"""
+        batcher = self.make_batcher(window_seconds=0.01)
+
+        with pytest.raises(RuntimeError):
+            batcher.analyze('boom', timeout=5)
+        batcher.close()
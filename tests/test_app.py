@@ -0,0 +1,289 @@
+"""
+Flask application tests against the legacy and the current database schema
+"""
+
+import io
+import queue
+import sqlite3
+from concurrent.futures import Future
+import pytest
+
+import app as app_module
+import create_base_schema
+from services.db_pool import reset_db_pools
+from services.parser import get_email_hash, parse_email_content
+from services.rules import analyze_email
+
+# Tables as created before the counter tables, latest-detection columns and
+# binary hashes existed
+LEGACY_SCHEMA = """
+    CREATE TABLE emails (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        filename TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        sha256 TEXT NOT NULL UNIQUE,
+        parse_summary_json TEXT,
+        uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE email_parsed (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email_id INTEGER NOT NULL,
+        headers_json TEXT,
+        text_body TEXT,
+        html_body TEXT,
+        html_as_text TEXT,
+        urls_json TEXT,
+        parse_time_ms INTEGER,
+        security_warnings TEXT,
+        url_analysis_summary TEXT,
+        FOREIGN KEY (email_id) REFERENCES emails(id)
+    );
+    CREATE TABLE detections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email_id INTEGER NOT NULL,
+        score INTEGER NOT NULL,
+        label TEXT NOT NULL,
+        confidence REAL NOT NULL,
+        evidence_json TEXT,
+        processing_time_ms INTEGER,
+        rules_checked INTEGER,
+        rules_fired INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (email_id) REFERENCES emails(id)
+    );
+    CREATE TABLE ai_detections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email_id INTEGER NOT NULL,
+        score INTEGER NOT NULL,
+        label TEXT NOT NULL,
+        evidence_json TEXT,
+        tokens_used INTEGER DEFAULT 0,
+        cost_estimate REAL DEFAULT 0.0,
+        processing_time_ms INTEGER,
+        success BOOLEAN DEFAULT 1,
+        error_message TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        confidence_score REAL,
+        explanation TEXT,
+        fallback_used BOOLEAN DEFAULT 0,
+        prompt_version TEXT,
+        analysis_metadata TEXT,
+        FOREIGN KEY (email_id) REFERENCES emails(id)
+    );
+    CREATE TABLE ai_usage_stats (
+        date TEXT PRIMARY KEY,
+        requests_count INTEGER DEFAULT 0,
+        tokens_used INTEGER DEFAULT 0,
+        total_cost REAL DEFAULT 0.0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX idx_emails_sha256 ON emails(sha256);
+    CREATE INDEX idx_detections_email_id ON detections(email_id);
+    CREATE INDEX idx_ai_detections_email_id ON ai_detections(email_id);
+"""
+
+
+def reset_app_state():
+    """Clear the per-process caches app.py keeps between requests"""
+    app_module._health_cache = None
+    app_module._hashes_converted = False
+    app_module._dedup_cache.clear()
+    app_module._analysis_cache.clear()
+    app_module._index_page_cache.clear()
+    for cached in (app_module.performance_summary_json, app_module.system_health_json,
+                   app_module.cache_stats_json):
+        cached.cache_clear()
+
+
+@pytest.fixture(params=['legacy', 'current'])
+def database(request, tmp_path, monkeypatch):
+    """Database path for each schema, with app.py pointed at it"""
+    monkeypatch.chdir(tmp_path)
+    if request.param == 'legacy':
+        db_path = str(tmp_path / 'legacy.db')
+        conn = sqlite3.connect(db_path)
+        conn.executescript(LEGACY_SCHEMA)
+        conn.close()
+    else:
+        assert create_base_schema.run_base_schema_creation()
+        db_path = str(tmp_path / create_base_schema.DATABASE_PATH)
+
+    monkeypatch.setattr(app_module, 'DATABASE_PATH', db_path)
+    monkeypatch.setattr(app_module, 'AI_ENABLED', False)
+    # Phase 4 services start background threads and are not under test here
+    monkeypatch.setattr(app_module, 'PHASE4_ENABLED', False)
+    monkeypatch.setattr(app_module, '_phase4_started', True)
+    monkeypatch.setattr(app_module.limiter, 'enabled', False)
+    reset_app_state()
+    yield db_path
+    reset_app_state()
+    reset_db_pools()
+
+
+@pytest.fixture
+def client(database):
+    """Flask test client for the database under test"""
+    app_module.app.config['TESTING'] = True
+    return app_module.app.test_client()
+
+
+def upload(client, content, filename='message.eml'):
+    """POST an email to /upload and return the response"""
+    return client.post('/upload', data={'file': (io.BytesIO(content), filename)},
+                       content_type='multipart/form-data')
+
+
+def count_rows(db_path, table):
+    """Row count of a table, read on a separate connection"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestHealthCheck:
+    """Test cases for /health"""
+
+    def test_health_reports_counts(self, client, database):
+        """Counts are reported on both schemas, with no missing core tables"""
+        response = client.get('/health')
+        assert response.status_code == 200
+
+        body = response.get_json()
+        assert body['status'] == 'healthy'
+        assert body['database'] == {'emails': 0, 'ai_analyses': 0, 'missing_tables': []}
+
+    def test_health_counts_stored_emails(self, client, database):
+        """The email total follows rows actually stored"""
+        conn = sqlite3.connect(database)
+        conn.executemany(
+            "INSERT INTO emails (filename, size_bytes, sha256) VALUES (?, 1, ?)",
+            [('a.eml', bytes([1]) * 32), ('b.eml', bytes([2]) * 32)]
+        )
+        conn.execute("DELETE FROM emails WHERE filename = 'a.eml'")
+        conn.commit()
+        conn.close()
+
+        assert client.get('/health').get_json()['database']['emails'] == 1
+
+
+class TestDuplicateUploads:
+    """Test cases for the duplicate-upload short-circuit"""
+
+    def test_duplicate_upload_redirects_to_existing_analysis(self, client, database, sample_emails):
+        """Re-uploading identical content shows the stored analysis without a new row"""
+        content = sample_emails['obvious_phishing.eml']
+        first = upload(client, content)
+        assert first.status_code == 302
+        assert '/analysis/' in first.headers['Location']
+
+        second = upload(client, content, 'renamed.eml')
+        assert second.status_code == 302
+        assert second.headers['Location'] == first.headers['Location']
+        assert count_rows(database, 'emails') == 1
+        assert count_rows(database, 'detections') == 1
+
+        # The repeat admitted the hash to the in-process cache
+        assert get_email_hash(content) in app_module._dedup_cache
+        assert upload(client, content).headers['Location'] == first.headers['Location']
+
+    def test_duplicate_of_hex_hash_row(self, client, database, sample_emails):
+        """Rows stored with hex-text hashes by older versions are still matched"""
+        content = sample_emails['safe_newsletter.eml']
+        conn = sqlite3.connect(database)
+        conn.execute("INSERT INTO emails (filename, size_bytes, sha256) VALUES ('old.eml', ?, ?)",
+                     (len(content), get_email_hash(content)))
+        conn.commit()
+        conn.close()
+
+        response = upload(client, content)
+        assert response.status_code == 302
+        assert response.headers['Location'].endswith('/analysis/1')
+        assert count_rows(database, 'emails') == 1
+
+
+class TestAnalysisWriter:
+    """Test cases for the group-commit analysis writer"""
+
+    def make_job(self, content, parsed=True):
+        """(args, kwargs, future) job as store_email_analysis queues it"""
+        parsed_email = parse_email_content(content, 'job.eml') if parsed else None
+        detection = analyze_email(parsed_email) if parsed else None
+        args = (None, 'job.eml', parsed_email, detection, None, None)
+        kwargs = {'email_hash': get_email_hash(content), 'size_bytes': len(content)}
+        return args, kwargs, Future()
+
+    def test_failed_job_only_rolls_back_itself(self, database, sample_emails):
+        """A job that fails inside the batch transaction does not undo the others"""
+        good = self.make_job(sample_emails['obvious_phishing.eml'])
+        bad = self.make_job(sample_emails['safe_newsletter.eml'], parsed=False)
+        other = self.make_job(sample_emails['auth_failure.eml'])
+
+        app_module._write_analysis_batch([good, bad, other])
+
+        assert good[2].result(timeout=1) is not None
+        assert bad[2].result(timeout=1) is None
+        assert other[2].result(timeout=1) is not None
+        assert count_rows(database, 'emails') == 2
+        assert count_rows(database, 'detections') == 2
+
+    def test_cancelled_job_is_not_written(self, database, sample_emails):
+        """Jobs whose request gave up waiting are skipped by the writer"""
+        cancelled = self.make_job(sample_emails['obvious_phishing.eml'])
+        cancelled[2].cancel()
+
+        app_module._write_analysis_batch([cancelled])
+        assert count_rows(database, 'emails') == 0
+
+    def test_timed_out_store_is_cancelled(self, database, sample_emails, monkeypatch):
+        """store_email_analysis cancels its job when the writer does not answer in time"""
+        pending = queue.Queue()
+        monkeypatch.setattr(app_module, '_write_queue', pending)
+        monkeypatch.setattr(app_module, '_ensure_analysis_writer', lambda: None)
+        monkeypatch.setattr(app_module, 'WRITE_RESULT_TIMEOUT_SECONDS', 0.01)
+
+        args, kwargs, _ = self.make_job(sample_emails['obvious_phishing.eml'])
+        assert app_module.store_email_analysis(*args, **kwargs) is None
+
+        job = pending.get_nowait()
+        assert job[2].cancelled()
+        app_module._write_analysis_batch([job])
+        assert count_rows(database, 'emails') == 0
+
+
+class TestResponseCaching:
+    """Test cases for the /health memo and short_cache conditional responses"""
+
+    def test_health_is_memoized(self, client, database, sample_emails):
+        """Healthy results are reused until HEALTH_CACHE_SECONDS passes"""
+        assert client.get('/health').get_json()['database']['emails'] == 0
+        upload(client, sample_emails['obvious_phishing.eml'])
+
+        assert client.get('/health').get_json()['database']['emails'] == 0
+        app_module._health_cache = None  # Interval elapsed
+        assert client.get('/health').get_json()['database']['emails'] == 1
+
+    def test_stats_answers_conditional_requests(self, client, database, sample_emails):
+        """/stats carries a short max-age and an ETag that yields 304 when unchanged"""
+        upload(client, sample_emails['obvious_phishing.eml'])
+        client.get('/analysis/1')  # Consume the upload's flash message
+
+        response = client.get('/stats')
+        assert response.status_code == 200
+        assert response.cache_control.max_age == app_module.MONITORING_CACHE_SECONDS
+        assert response.cache_control.public
+        etag, weak = response.get_etag()
+        assert etag and weak
+
+        repeat = client.get('/stats', headers={'If-None-Match': response.headers['ETag']})
+        assert repeat.status_code == 304
+        assert repeat.data == b''
+
+    def test_pages_with_flashes_are_not_cached(self, client, database, sample_emails):
+        """A response showing a flash message must not be reused"""
+        upload(client, sample_emails['obvious_phishing.eml'])  # Leaves a flash pending
+
+        response = client.get('/stats')
+        assert response.status_code == 200
+        assert response.headers.get('ETag') is None
@@ -0,0 +1,79 @@
+"""
+Unit tests for the SQLite connection pool
+"""
+
+import os
+import sqlite3
+import tempfile
+import pytest
+from services.db_pool import WAL_CHECKPOINT_BYTES, ConnectionPool
+
+
+class TestConnectionPool:
+    """Test cases for ConnectionPool"""
+
+    def setup_method(self):
+        """Create a pool over a temporary database"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'pool.db')
+        self.pool = ConnectionPool(self.db_path, max_size=2, timeout=0.1)
+
+    def teardown_method(self):
+        """Close pooled connections and remove the database"""
+        self.pool.close_all()
+        self.tmpdir.cleanup()
+
+    def test_connections_are_reused(self):
+        """Released connections should be handed out again"""
+        with self.pool.connection() as conn:
+            first = conn
+        with self.pool.connection() as conn:
+            assert conn is first
+        assert self.pool.get_stats()['created'] == 1
+
+    def test_connection_configuration(self):
+        """Pooled connections use WAL mode and sqlite3.Row"""
+        with self.pool.connection() as conn:
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert isinstance(conn.execute('SELECT 1 AS one').fetchone(), sqlite3.Row)
+
+    def test_autocheckpoint_follows_page_size(self):
+        """The checkpoint interval is a byte budget converted to pages"""
+        with self.pool.connection() as conn:
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            pages = conn.execute('PRAGMA wal_autocheckpoint').fetchone()[0]
+            assert pages * page_size == WAL_CHECKPOINT_BYTES
+
+    def test_pool_is_bounded(self):
+        """Acquiring beyond max_size should time out"""
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+
+        with pytest.raises(sqlite3.OperationalError):
+            self.pool.acquire()
+
+        self.pool.release(first)
+        self.pool.release(second)
+
+    def test_release_rolls_back_open_transaction(self):
+        """Uncommitted work must not leak to the next borrower"""
+        with self.pool.connection() as conn:
+            conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY)')
+            conn.commit()
+            conn.execute('INSERT INTO items DEFAULT VALUES')
+            assert conn.in_transaction
+
+        with self.pool.connection() as conn:
+            assert not conn.in_transaction
+            assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+
+    def test_broken_connection_is_replaced(self):
+        """A pooled connection closed behind the pool's back is not handed out"""
+        with self.pool.connection() as conn:
+            broken = conn
+        broken.close()
+
+        with self.pool.connection() as conn:
+            assert conn is not broken
+            assert conn.execute('SELECT 1').fetchone()[0] == 1
+        assert self.pool.get_stats()['created'] == 1
@@ -0,0 +1,66 @@
+"""
+Unit tests for the background metric writer
+"""
+
+import os
+import sqlite3
+import tempfile
+from services.monitoring import PerformanceMonitor
+
+
+class TestMetricWriter:
+    """Test cases for PerformanceMonitor's metric writer thread"""
+
+    def setup_method(self):
+        """Monitor writing to a temporary database"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.monitor = PerformanceMonitor()
+        self.monitor.db_path = os.path.join(self.tmpdir.name, 'metrics.db')
+
+    def teardown_method(self):
+        """Remove the temporary database"""
+        self.tmpdir.cleanup()
+
+    def create_metrics_table(self):
+        """Minimal performance_metrics table for the writer's INSERT"""
+        conn = sqlite3.connect(self.monitor.db_path)
+        conn.execute('''
+            CREATE TABLE performance_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                metric_type TEXT, metric_name TEXT, value REAL, unit TEXT,
+                component TEXT, context TEXT, recorded_at TEXT, session_id TEXT
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def count_metrics(self):
+        conn = sqlite3.connect(self.monitor.db_path)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM performance_metrics').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_queued_metrics_are_written(self):
+        """flush_metrics returns once queued metrics are stored"""
+        self.create_metrics_table()
+        for i in range(3):
+            self.monitor.record_metric('test', f'metric_{i}', i, 'count', 'tests')
+
+        assert self.monitor.flush_metrics(timeout=5)
+        assert self.count_metrics() == 3
+
+    def test_writer_survives_connection_failure(self):
+        """A database that cannot be opened drops the batch, not the writer"""
+        db_path = self.monitor.db_path
+        self.monitor.db_path = os.path.join(self.tmpdir.name, 'missing', 'metrics.db')
+        self.monitor.record_metric('test', 'lost', 1, 'count', 'tests')
+
+        assert self.monitor.flush_metrics(timeout=5)
+        assert self.monitor._writer_thread.is_alive()
+
+        self.monitor.db_path = db_path
+        self.create_metrics_table()
+        self.monitor.record_metric('test', 'kept', 1, 'count', 'tests')
+        assert self.monitor.flush_metrics(timeout=5)
+        assert self.count_metrics() == 1
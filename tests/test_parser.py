@@ -2,9 +2,14 @@
 Unit tests for email parser module
 """
 
+import email
+import email.policy
 import os
 import pytest
-from services.parser import parse_email_content, EmailParser, EmailParsingError
+import hashlib
+import io
+import tempfile
+from services.parser import parse_email_content, get_email_hash, read_stream_with_hash, EmailParser, EmailParsingError, PARSE_CHUNK_SIZE
 
 
 class TestEmailParser:
@@ -216,4 +221,53 @@ class TestEmailParser:
             
             # Text should be readable Unicode
             assert isinstance(parsed.text_body, str)
-            assert isinstance(parsed.html_as_text, str)
\ No newline at end of file
+            assert isinstance(parsed.html_as_text, str)
+
+    
+    def test_chunked_parse_matches_single_pass(self):
+        """Messages larger than one parse chunk parse the same as message_from_bytes"""
+        # CRLF lines of odd length so chunk boundaries split lines and line endings
+        body = b"Visit http://example.com/offer now\r\n" * (3 * PARSE_CHUNK_SIZE // 35)
+        email_content = (
+            b"From: sender@example.com\r\nTo: user@example.com\r\nSubject: Large\r\n"
+            b"Content-Type: text/plain\r\n\r\n" + body
+        )
+        
+        msg = self.parser._parse_with_timeout(email_content)
+        expected = email.message_from_bytes(email_content, policy=email.policy.default)
+        assert msg.as_bytes() == expected.as_bytes()
+        assert msg["Subject"] == "Large"
+
+
+class TestEmailHash:
+    """Test cases for email content hashing"""
+    
+    def test_email_hash_matches_sha256(self):
+        """Accelerated backend must produce standard SHA-256 digests"""
+        content = b"From: test@example.com\nSubject: Hash\n\nBody"
+        assert get_email_hash(content) == hashlib.sha256(content).hexdigest()
+        assert len(get_email_hash(b"")) == 64
+    
+    def test_read_stream_with_hash_returns_content(self):
+        """Single-pass read must return the full content and its digest"""
+        content = b"From: test@example.com\n\n" + b"y" * 200000
+        stream = io.BytesIO(content)
+        data, digest = read_stream_with_hash(stream, chunk_size=4096)
+        
+        assert data == content
+        assert digest == get_email_hash(content)
+        assert stream.tell() == 0
+    
+    def test_read_stream_with_hash_spooled_upload(self):
+        """Spooled uploads must hash the same in memory and rolled to disk"""
+        content = b"From: test@example.com\n\n" + b"z" * 50000
+        for max_size in (len(content) + 1, 1024):
+            stream = tempfile.SpooledTemporaryFile(max_size=max_size, mode="rb+")
+            stream.write(content)
+            stream.seek(0)
+            data, digest = read_stream_with_hash(stream)
+            
+            assert data == content
+            assert digest == get_email_hash(content)
+            assert stream.tell() == 0
+            stream.close()
@@ -0,0 +1,54 @@
+"""
+Unit tests for the bucket:// rate limit storage
+"""
+
+import time
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from services.rate_limit_storage import BucketStorage
+
+
+class TestBucketStorage:
+    """Test cases for BucketStorage"""
+
+    def setup_method(self):
+        """Fresh storage per test"""
+        self.storage = BucketStorage()
+
+    def test_registered_scheme(self):
+        """bucket:// URIs resolve to BucketStorage"""
+        assert isinstance(storage_from_string('bucket://'), BucketStorage)
+
+    def test_counts_within_window(self):
+        """Increments accumulate until the window expires"""
+        assert self.storage.incr('k', 60) == 1
+        assert self.storage.incr('k', 60) == 2
+        assert self.storage.get('k') == 2
+        assert self.storage.get_expiry('k') > time.time()
+
+    def test_window_expiry_resets_count(self):
+        """An expired window reads as zero and restarts on increment"""
+        self.storage.incr('k', 0.05)
+        time.sleep(0.06)
+        assert self.storage.get('k') == 0
+        assert self.storage.incr('k', 60) == 1
+
+    def test_clear_and_reset(self):
+        """clear() drops one key, reset() drops all"""
+        self.storage.incr('a', 60)
+        self.storage.incr('b', 60)
+        self.storage.clear('a')
+        assert self.storage.get('a') == 0
+        assert self.storage.reset() == 1
+        assert self.storage.get('b') == 0
+
+    def test_fixed_window_limiter(self):
+        """Works with the fixed-window strategy Flask-Limiter uses"""
+        limiter = FixedWindowRateLimiter(self.storage)
+        limit = parse('2 per minute')
+
+        assert limiter.hit(limit, 'client')
+        assert limiter.hit(limit, 'client')
+        assert not limiter.hit(limit, 'client')
+        assert limiter.hit(limit, 'other')
@@ -3,10 +3,11 @@ Unit tests for rule-based detection engine
 """
 
 import os
+import threading
 import pytest
 from services.parser import parse_email_content
 from services.rules import (
-    RuleEngine, analyze_email, 
+    RuleEngine, analyze_email, get_rule_engine,
     HeaderMismatchRule, ReplyToMismatchRule, AuthFailureRule,
     UrgentLanguageRule, URLShortenerRule, SuspiciousTLDRule,
     UnicodeSpoofRule, NoPersonalizationRule, AttachmentKeywordsRule
@@ -296,6 +297,16 @@ class TestRuleEngineIntegration:
         labels = [r.label for r in results]
         assert len(set(labels)) == 1  # All labels the same
     
+    def test_rule_engine_reused_per_thread(self):
+        """Test that each thread gets one engine that is reused across calls"""
+        assert get_rule_engine() is get_rule_engine()
+        
+        other = []
+        thread = threading.Thread(target=lambda: other.append(get_rule_engine()))
+        thread.start()
+        thread.join()
+        assert other[0] is not get_rule_engine()
+    
     def test_scoring_boundaries(self):
         """Test score-to-label mapping boundaries"""
         # We can't easily create emails with exact scores, but we can test the logic